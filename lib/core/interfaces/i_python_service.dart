@@ -34,6 +34,7 @@ abstract class IPythonService {
     String? proxyUrl,
     bool embedSubtitles = false,
     String? subtitleLanguage,
+    bool skipArchived = true,
   });
 
   /// Download video with specified format (Legacy)
@@ -50,6 +51,14 @@ abstract class IPythonService {
   /// Extract cookies from browser for authenticated access
   Future<String?> extractCookiesFromBrowser(String browser);
 
+  /// Download thumbnails into the bridge's disk cache.
+  /// Returns a map of thumbnail URL to local file path.
+  Future<Map<String, String>> prefetchThumbnails(
+    List<String> urls, {
+    int? targetWidth,
+    String? cookieFile,
+  });
+
   /// Get list of supported websites
   Future<List<String>> getSupportedSites();
 
@@ -225,6 +225,7 @@ class PythonService implements IPythonService {
     String? proxyUrl,
     bool embedSubtitles = false,
     String? subtitleLanguage,
+    bool skipArchived = true,
   }) async {
     try {
       final params = <String, dynamic>{
@@ -234,6 +235,7 @@ class PythonService implements IPythonService {
         'taskId': taskId,
         'mediaType': mediaType.name,
         'downloadAllGallery': downloadAllGallery,
+        'skipArchived': skipArchived,
       };
 
       if (cookieFile != null) {
@@ -302,6 +304,43 @@ class PythonService implements IPythonService {
     }
   }
 
+  @override
+  Future<Map<String, String>> prefetchThumbnails(
+    List<String> urls, {
+    int? targetWidth,
+    String? cookieFile,
+  }) async {
+    if (urls.isEmpty) {
+      return {};
+    }
+    try {
+      final params = <String, dynamic>{'urls': urls};
+      if (targetWidth != null) {
+        params['targetWidth'] = targetWidth;
+      }
+      if (cookieFile != null) {
+        params['cookiesFile'] = cookieFile;
+      }
+
+      final result = await _platform
+          .invokeMethod<String>('prefetchThumbnails', params)
+          .timeout(const Duration(seconds: 60));
+
+      if (result == null) {
+        return {};
+      }
+      final data = json.decode(result) as Map<String, dynamic>;
+      if (data['success'] != true) {
+        return {};
+      }
+      return (data['thumbnails'] as Map<String, dynamic>? ?? {})
+          .map((url, path) => MapEntry(url, path as String));
+    } catch (e) {
+      AppLogger.error("Failed to prefetch thumbnails", error: e);
+      return {};
+    }
+  }
+
   @override
   Future<String?> extractCookiesFromBrowser(String browser) async {
     try {
@@ -384,6 +423,7 @@ class PythonService implements IPythonService {
     String? proxyUrl,
     bool embedSubtitles = false,
     String? subtitleLanguage,
+    bool skipArchived = true,
   }) => instance.downloadMedia(
     url: url,
     outputPath: outputPath,
@@ -401,6 +441,7 @@ class PythonService implements IPythonService {
     proxyUrl: proxyUrl,
     embedSubtitles: embedSubtitles,
     subtitleLanguage: subtitleLanguage,
+    skipArchived: skipArchived,
   );
   static Future<String?> extractCookiesFromBrowserStatic(String browser) =>
       instance.extractCookiesFromBrowser(browser);
@@ -1,5 +1,6 @@
 package com.example.ytdlp_bridge
 
+import com.chaquo.python.Kwarg
 import com.chaquo.python.Python
 import com.chaquo.python.android.AndroidPlatform
 import android.content.Context
@@ -46,6 +47,84 @@ class PythonBridge(private val context: Context) {
             Log.e(TAG, "FATAL: Failed to initialize Python runtime", e)
             throw RuntimeException("Python initialization failed: ${e.message}", e)
         }
+        configureComponentCache()
+        configureDownloadArchive()
+        configureThumbnailCache()
+    }
+
+    /**
+     * Keep yt-dlp's EJS solver scripts in app storage so YouTube extraction
+     * does not have to fetch them from GitHub on the hot path.
+     */
+    private fun configureComponentCache() {
+        try {
+            val cacheDir = java.io.File(context.filesDir, "ytdlp-cache").absolutePath
+            val module = Python.getInstance().getModule(MODULE_NAME)
+            val result = module.callAttr("configure_component_cache", cacheDir)
+            Log.d(TAG, "Component cache: $result")
+        } catch (e: Exception) {
+            Log.w(TAG, "Failed to configure component cache", e)
+        }
+    }
+
+    /**
+     * Keep the download archive in app storage so already-downloaded items
+     * are still skipped after the system clears the cache directory.
+     */
+    private fun configureDownloadArchive() {
+        try {
+            val archivePath = java.io.File(context.filesDir, "ytdlp-archive.idx").absolutePath
+            val module = Python.getInstance().getModule(MODULE_NAME)
+            val result = module.callAttr("configure_download_archive", archivePath)
+            Log.d(TAG, "Download archive: $result")
+        } catch (e: Exception) {
+            Log.w(TAG, "Failed to configure download archive", e)
+        }
+    }
+
+    /**
+     * Keep prefetched thumbnails in the app's cache directory, which the
+     * system may trim; the bridge re-fetches anything that went missing.
+     */
+    private fun configureThumbnailCache() {
+        try {
+            val cacheDir = java.io.File(context.cacheDir, "ytdlp-thumbnails").absolutePath
+            val module = Python.getInstance().getModule(MODULE_NAME)
+            val result = module.callAttr("configure_thumbnail_cache", cacheDir)
+            Log.d(TAG, "Thumbnail cache: $result")
+        } catch (e: Exception) {
+            Log.w(TAG, "Failed to configure thumbnail cache", e)
+        }
+    }
+
+    /**
+     * Download thumbnails into the local thumbnail cache
+     *
+     * @param urls Thumbnail URLs
+     * @param targetWidth Optional width to downscale to
+     * @param cookiesFile Optional path to cookies file
+     * @return JSON string with a map of URL to local file path
+     */
+    fun prefetchThumbnails(
+        urls: List<String>,
+        targetWidth: Int? = null,
+        cookiesFile: String? = null
+    ): String {
+        Log.d(TAG, "PythonBridge.prefetchThumbnails() called for ${urls.size} URLs")
+        return try {
+            val module = Python.getInstance().getModule(MODULE_NAME)
+            // Sent as JSON so Python receives a plain list
+            val result = module.callAttr(
+                "prefetch_thumbnails",
+                org.json.JSONArray(urls).toString(),
+                targetWidth,
+                cookiesFile
+            )
+            result.toString()
+        } catch (e: Exception) {
+            Log.e(TAG, "Failed to prefetch thumbnails", e)
+            """{"success":false,"error":"${e.message}"}"""
+        }
     }
 
     /**
@@ -184,6 +263,7 @@ class PythonBridge(private val context: Context) {
      * @param cookiesFile Optional path to cookies file
      * @param downloadAllGallery Whether to download all gallery items
      * @param selectedIndices List of selected indices for gallery downloads
+     * @param skipArchived Skip items already in the download archive whose file still exists
      * @return JSON string with download result
      */
     fun downloadMedia(
@@ -203,7 +283,8 @@ class PythonBridge(private val context: Context) {
         customUserAgent: String? = null,
         proxyUrl: String? = null,
         embedSubtitles: Boolean = false,
-        subtitleLanguage: String? = null
+        subtitleLanguage: String? = null,
+        skipArchived: Boolean = true
     ): String {
         Log.d(TAG, "PythonBridge.downloadMedia() called")
         Log.d(TAG, "  URL: $url")
@@ -230,7 +311,8 @@ class PythonBridge(private val context: Context) {
                 customUserAgent,
                 proxyUrl,
                 embedSubtitles,
-                subtitleLanguage
+                subtitleLanguage,
+                Kwarg("skip_archived", skipArchived)
             )
 
             Log.d(TAG, "  Python download_media() returned successfully")
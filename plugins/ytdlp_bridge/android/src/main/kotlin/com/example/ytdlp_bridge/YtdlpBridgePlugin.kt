@@ -223,6 +223,7 @@ class YtdlpBridgePlugin : FlutterPlugin, MethodCallHandler, EventChannel.StreamH
                 val proxyUrl = call.argument<String>("proxyUrl")
                 val embedSubtitles = call.argument<Boolean>("embedSubtitles") ?: false
                 val subtitleLanguage = call.argument<String>("subtitleLanguage")
+                val skipArchived = call.argument<Boolean>("skipArchived") ?: true
 
                 if (url.isNullOrEmpty() || outputPath.isNullOrEmpty()) {
                     result.error("INVALID_ARGUMENT", "URL and outputPath are required", null)
@@ -276,7 +277,8 @@ class YtdlpBridgePlugin : FlutterPlugin, MethodCallHandler, EventChannel.StreamH
                                 customUserAgent,
                                 proxyUrl,
                                 embedSubtitles,
-                                subtitleLanguage
+                                subtitleLanguage,
+                                skipArchived
                             )
                         }
                         result.success(downloadResult)
@@ -301,6 +303,23 @@ class YtdlpBridgePlugin : FlutterPlugin, MethodCallHandler, EventChannel.StreamH
                     }
                 }
             }
+            "prefetchThumbnails" -> {
+                val urls = call.argument<List<String>>("urls") ?: emptyList()
+                val targetWidth = call.argument<Int>("targetWidth")
+                val cookiesFile = call.argument<String>("cookiesFile")
+
+                scope.launch {
+                    try {
+                        val prefetchResult = withContext(Dispatchers.IO) {
+                            pythonBridge.prefetchThumbnails(urls, targetWidth, cookiesFile)
+                        }
+                        result.success(prefetchResult)
+                    } catch (e: Exception) {
+                        Log.e(TAG, "Failed to prefetch thumbnails", e)
+                        result.error("PREFETCH_THUMBNAILS_ERROR", e.message, null)
+                    }
+                }
+            }
             "cancelDownload" -> {
                 val taskId = call.argument<String>("taskId")
                 if (taskId.isNullOrEmpty()) {
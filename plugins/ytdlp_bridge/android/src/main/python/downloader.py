@@ -14,13 +14,58 @@ from yt_dlp.utils import (
     DownloadCancelled,
     ExtractorError,
     GeoRestrictedError,
+    LazyList,
+    ThrottledDownload,
     UnsupportedError,
 )
+from yt_dlp.cookies import YoutubeDLCookieJar
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.postprocessor.common import PostProcessor
+try:
+    from PIL import Image
+except ImportError:  # Downscaling is skipped without Pillow
+    Image = None
+import functools
+import hashlib
+import http.client
+import io
+import itertools
 import json
+import multiprocessing
 import os
+import pstats
 import tempfile
 import random
 import re
+import secrets
+import shutil
+import stat
+import sys
+import argparse
+import asyncio
+import collections
+import cProfile
+import ctypes
+import ctypes.util
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import urllib.parse
+import urllib.request
+import uuid
+
+# Private module: the solver version and SHA3-512 hashes yt-dlp was built
+# against. Layout as of yt-dlp 2026.08.19 (the build installs
+# yt-dlp>=2025.12.08, see android/build.gradle); if a release moves it, the
+# fallback below leaves GitHub as the only source of the solver scripts.
+try:
+    from yt_dlp.extractor.youtube.jsc._builtin.vendor import (
+        HASHES as _EJS_HASHES,
+        VERSION as _EJS_VERSION,
+    )
+except ImportError:  # yt-dlp without the EJS challenge solver
+    _EJS_HASHES, _EJS_VERSION = {}, None
 
 _CANCELLED_TASKS = set()
 
@@ -218,8 +263,8 @@ def _is_live_content(info):
 
 
 def _get_base_ydl_opts(
-    cookies_file=None,
     enable_anti_ban=True,
+    adaptive_throttle=False,
     sleep_interval=None,
     concurrent_fragments=None,
     user_agent=None,
@@ -228,9 +273,14 @@ def _get_base_ydl_opts(
     """
     Get base yt-dlp options with anti-ban measures and retry configuration.
 
+    Cookies are not part of the options: pass the cookies file to
+    ``_create_ydl`` so the cached jar is used instead of yt-dlp
+    re-parsing the file on every call.
+
     Args:
-        cookies_file: Optional path to cookies file
         enable_anti_ban: Whether to enable anti-ban measures (sleep intervals, user-agent)
+        adaptive_throttle: Leave throttle detection to _ThroughputMonitor
+            instead of yt-dlp's fixed rate limit
 
     Returns:
         dict: Base yt-dlp options
@@ -257,12 +307,13 @@ def _get_base_ydl_opts(
         'quiet': False,
         'no_warnings': False,
 
-        # Remote EJS components: download pre-computed JavaScript solver scripts
-        # from GitHub so a local JS runtime (deno/quickjs) is not required.
-        # This fixes the "No supported JavaScript runtime" warning on Android.
-        'remote_components': ['ejs:github'],
     }
 
+    # EJS solver scripts: served from the local component cache when it is
+    # ready, otherwise fetched from GitHub as before.
+    _apply_component_cache(opts)
+    _apply_write_path(opts)
+
     # Anti-ban measures
     if enable_anti_ban:
         sleep = int(sleep_interval) if sleep_interval is not None else 2
@@ -275,9 +326,6 @@ def _get_base_ydl_opts(
             'max_sleep_interval': max(5, sleep),
             'sleep_interval_requests': 1,
 
-            # Throttle detection - if speed drops below 100KB/s, it might be throttled
-            'throttledratelimit': 100000,
-
             # Use a browser user-agent
             'user_agent': ua,
 
@@ -285,20 +333,1739 @@ def _get_base_ydl_opts(
             'referer': 'https://www.google.com/',
         })
 
+        if not adaptive_throttle:
+            # Throttle detection - if speed drops below 100KB/s, it might be throttled
+            opts['throttledratelimit'] = 100000
+
+    if adaptive_throttle:
+        # yt-dlp grows its read size up to 4MB, and each read blocks until it
+        # is full: at a throttled rate the progress hook, and with it
+        # _ThroughputMonitor, would go quiet for minutes
+        opts['buffersize'] = _THROUGHPUT_BLOCK_SIZE
+        opts['noresizebuffer'] = True
+
     if proxy_url:
         opts['proxy'] = proxy_url
 
-    # Cookie support
-    if cookies_file and os.path.exists(cookies_file):
-        opts['cookiefile'] = cookies_file
+    return opts
+
+
+# ============================================================================
+# COOKIE JAR CACHE
+# ============================================================================
+
+# Parsed Netscape cookie files, keyed by absolute path. Each entry remembers
+# the (mtime_ns, size) it was parsed at so a changed file is re-read lazily.
+_COOKIE_JAR_CACHE = {}
+_COOKIE_CACHE_LOCK = threading.Lock()
+_COOKIE_WRITE_LOCK = threading.Lock()  # serialises write-backs of rotated cookies
+
+# Browser extractions are expensive (the whole store is decrypted), so reuse
+# the exported file for a short while unless a refresh is forced.
+_BROWSER_COOKIE_TTL = 300
+_BROWSER_COOKIE_EXPORTS = {}  # (browser, profile) -> (exported_at, path)
+
+# Short-link and alias hosts whose cookies live under another site.
+_COOKIE_DOMAIN_ALIASES = {
+    'youtu.be': 'youtube.com',
+    'x.com': 'twitter.com',
+    'instagr.am': 'instagram.com',
+    'fb.watch': 'facebook.com',
+    'redd.it': 'reddit.com',
+}
+
+
+def _cookie_site(host):
+    """Reduce a host or cookie domain to the site it belongs to."""
+    host = (host or '').lower().lstrip('.')
+    host = _COOKIE_DOMAIN_ALIASES.get(host, host)
+    labels = host.split('.')
+    if len(labels) <= 2 or ':' in host or labels[-1].isdigit():
+        return host
+    # Keep three labels for second-level registries such as co.uk / com.br
+    if len(labels[-1]) == 2 and labels[-2] in ('co', 'com', 'net', 'org', 'gov', 'ac', 'edu'):
+        return '.'.join(labels[-3:])
+    site = '.'.join(labels[-2:])
+    return _COOKIE_DOMAIN_ALIASES.get(site, site)
+
+
+def _cookie_key(cookie):
+    return (cookie.domain, cookie.path, cookie.name)
+
+
+def _load_cached_cookies(cookies_file):
+    """
+    Return the cache entry for a cookies file, parsing it only if it changed.
+
+    Returns:
+        dict: Entry with the parsed 'cookies' and their 'values' by key, or None
+    """
+    if not cookies_file:
+        return None
+    path = os.path.abspath(cookies_file)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    with _COOKIE_CACHE_LOCK:
+        entry = _COOKIE_JAR_CACHE.get(path)
+        if entry and entry['stamp'] == stamp:
+            return entry
+
+    jar = YoutubeDLCookieJar(path)
+    try:
+        jar.load(ignore_discard=True, ignore_expires=True)
+    except Exception as e:
+        print(f"Failed to load cookies from {path}: {e}")
+        return None
+
+    entry = _cookie_cache_entry(stamp, list(jar))
+    with _COOKIE_CACHE_LOCK:
+        _COOKIE_JAR_CACHE[path] = entry
+    return entry
+
+
+def _cookie_cache_entry(stamp, cookies):
+    return {
+        'stamp': stamp,
+        'cookies': cookies,
+        'values': {_cookie_key(c): (c.value, c.expires) for c in cookies},
+    }
+
+
+def _cookie_jar_from_cache(cookies_file):
+    """
+    Build a fresh cookie jar for one request from the cached parse.
+
+    The whole file is copied in, so extractors that hop between domains
+    (YouTube via google.com, CDNs on other sites) get every cookie they
+    would have got from 'cookiefile'. Each call gets its own jar, so
+    concurrent tasks never share state.
+    """
+    entry = _load_cached_cookies(cookies_file)
+    if entry is None:
+        return None
+    jar = YoutubeDLCookieJar()
+    for cookie in entry['cookies']:
+        jar.set_cookie(cookie)
+    return jar
+
+
+def _save_rotated_cookies(cookies_file, loaded, jar):
+    """
+    Write cookies the session changed back to the cookies file.
+
+    Sites such as YouTube rotate session cookies while extracting; without
+    this the file keeps the stale ones and later requests get logged out.
+    Only the cookies this jar added, changed or dropped relative to what it
+    was loaded with are merged into the current file contents, so concurrent
+    tasks do not overwrite each other's rotations.
+    """
+    current = {_cookie_key(c): c for c in jar}
+    changed = [c for key, c in current.items()
+               if loaded['values'].get(key) != (c.value, c.expires)]
+    dropped = [key for key in loaded['values'] if key not in current]
+    if not changed and not dropped:
+        return
+
+    path = os.path.abspath(cookies_file)
+    with _COOKIE_WRITE_LOCK:
+        entry = _load_cached_cookies(path) or loaded
+        merged = {_cookie_key(c): c for c in entry['cookies']}
+        for key in dropped:
+            merged.pop(key, None)
+        for cookie in changed:
+            merged[_cookie_key(cookie)] = cookie
+
+        out = YoutubeDLCookieJar()
+        for cookie in merged.values():
+            out.set_cookie(cookie)
+        try:
+            _write_file_atomic(path, lambda tmp: out.save(tmp, ignore_discard=True, ignore_expires=True))
+            st = os.stat(path)
+        except Exception as e:
+            print(f"Failed to save cookies to {path}: {e}")
+            return
+        # Our own write does not need a re-parse
+        with _COOKIE_CACHE_LOCK:
+            _COOKIE_JAR_CACHE[path] = _cookie_cache_entry(
+                (st.st_mtime_ns, st.st_size), list(merged.values()))
+
+
+def _create_ydl(ydl_opts, cookies_file=None):
+    """
+    Create a YoutubeDL instance, filling its cookie jar from the cache if any.
+
+    Cookies are added to ydl.cookiejar rather than passed as 'cookiefile', so
+    yt-dlp does not re-parse the file per call. Cookies the session rotates
+    are written back when the instance closes (see _save_rotated_cookies).
+    """
+    ydl = yt_dlp.YoutubeDL(ydl_opts)
+    entry = _load_cached_cookies(cookies_file)
+    if entry is not None:
+        jar = ydl.cookiejar
+        for cookie in entry['cookies']:
+            jar.set_cookie(cookie)
+        ydl.add_close_hook(lambda: _save_rotated_cookies(cookies_file, entry, jar))
+    return ydl
+
+
+def _write_file_atomic(path, write_fn):
+    """Write a file via a temp file in the same directory, then rename."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    os.close(fd)
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# ============================================================================
+# EJS COMPONENT CACHE
+# ============================================================================
+
+# YouTube needs the EJS challenge solver scripts. yt-dlp looks for them in its
+# cache dir before going to GitHub, so we keep that cache populated ourselves:
+# scripts are pinned to the solver version yt-dlp was built against and
+# verified against its SHA3-512 hashes before being installed.
+_EJS_REPOSITORY = 'yt-dlp/ejs'
+_EJS_CACHE_SECTION = 'challenge-solver'
+_EJS_SCRIPTS = {
+    'lib': 'yt.solver.lib.min.js',
+    'core': 'yt.solver.core.min.js',
+}
+_EJS_REFRESH_INTERVAL = 24 * 60 * 60
+_EJS_RETRY_INTERVAL = 5 * 60
+_EJS_STATE = {
+    'cache_dir': None,
+    'ready': False,
+    'stamps': None,          # (mtime_ns, size) per script when last verified
+    'refreshing': False,
+    'last_refresh': 0,
+    'last_error': None,
+}
+_EJS_LOCK = threading.Lock()
+
+
+def _ejs_cache_file(cache_dir, kind):
+    return os.path.join(cache_dir, _EJS_CACHE_SECTION, f'{kind}.json')
+
+
+def _verify_ejs_script(kind, code):
+    """Check a solver script against the hash pinned by yt-dlp."""
+    expected = _EJS_HASHES.get(_EJS_SCRIPTS[kind])
+    if not expected or not code:
+        return False
+    return hashlib.sha3_512(code.encode()).hexdigest() == expected
+
+
+def _install_ejs_script(cache_dir, kind, code):
+    """Verify a solver script and write it in yt-dlp's cache format."""
+    if not _verify_ejs_script(kind, code):
+        raise ValueError(f'Hash mismatch for EJS {kind} script')
+
+    path = _ejs_cache_file(cache_dir, kind)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        'yt-dlp_version': yt_dlp.version.__version__,
+        'data': {'version': _EJS_VERSION, 'variant': 'minified', 'code': code},
+    }
+
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+
+    _write_file_atomic(path, write)
+
+
+def _ejs_cache_is_valid(cache_dir):
+    """Return True if every solver script in the cache matches the pinned version."""
+    if not _EJS_VERSION:
+        return False
+    for kind in _EJS_SCRIPTS:
+        try:
+            with open(_ejs_cache_file(cache_dir, kind), encoding='utf-8') as f:
+                data = json.load(f).get('data') or {}
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != _EJS_VERSION or not _verify_ejs_script(kind, data.get('code')):
+            return False
+    return True
+
+
+def _ejs_cache_stamps(cache_dir):
+    """Return (mtime_ns, size) of each cached script, or None if one is missing."""
+    stamps = []
+    for kind in _EJS_SCRIPTS:
+        try:
+            st = os.stat(_ejs_cache_file(cache_dir, kind))
+        except OSError:
+            return None
+        stamps.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamps)
+
+
+def _set_ejs_ready(cache_dir):
+    """Verify the cache and record the result with the file stamps it was based on."""
+    # Stamped before hashing, so a write that races the check is seen next time
+    stamps = _ejs_cache_stamps(cache_dir)
+    ready = stamps is not None and _ejs_cache_is_valid(cache_dir)
+    with _EJS_LOCK:
+        if _EJS_STATE['cache_dir'] == cache_dir:
+            _EJS_STATE['ready'] = ready
+            _EJS_STATE['stamps'] = stamps
+    return ready
+
+
+def _refresh_component_cache_worker(cache_dir):
+    error = None
+    try:
+        for kind, filename in _EJS_SCRIPTS.items():
+            url = (f'https://github.com/{_EJS_REPOSITORY}/releases/download/'
+                   f'{_EJS_VERSION}/{filename}')
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                code = resp.read().decode('utf-8')
+            _install_ejs_script(cache_dir, kind, code)
+    except Exception as e:
+        error = str(e)
+        print(f"EJS component refresh failed: {e}")
+
+    with _EJS_LOCK:
+        _EJS_STATE['refreshing'] = False
+        _EJS_STATE['last_refresh'] = time.time()
+        _EJS_STATE['last_error'] = error
+    _set_ejs_ready(cache_dir)
+
+
+def _start_component_refresh(force=False):
+    """Start a background refresh of the solver scripts if one is due."""
+    with _EJS_LOCK:
+        cache_dir = _EJS_STATE['cache_dir']
+        if not cache_dir or not _EJS_VERSION or _EJS_STATE['refreshing']:
+            return None
+        interval = _EJS_RETRY_INTERVAL if _EJS_STATE['last_error'] else _EJS_REFRESH_INTERVAL
+        if not force and time.time() - _EJS_STATE['last_refresh'] < interval:
+            return None
+        _EJS_STATE['refreshing'] = True
+
+    thread = threading.Thread(
+        target=_refresh_component_cache_worker, args=(cache_dir,),
+        name='ejs-refresh', daemon=True)
+    thread.start()
+    return thread
+
+
+def _apply_component_cache(opts):
+    """
+    Point yt-dlp at the local EJS cache.
+
+    When the cache holds verified scripts, remote components are disabled so
+    extraction never touches the network for them. Otherwise GitHub remains
+    the fallback and a background refresh is scheduled. The scripts are
+    stat()ed on every call and hashed again if they changed since they were
+    verified, so a deleted or overwritten cache never disables the fallback.
+    """
+    with _EJS_LOCK:
+        cache_dir = _EJS_STATE['cache_dir']
+        ready = _EJS_STATE['ready']
+        stamps = _EJS_STATE['stamps']
+
+    if ready and _ejs_cache_stamps(cache_dir) != stamps:
+        ready = _set_ejs_ready(cache_dir)
+
+    if cache_dir:
+        opts['cachedir'] = cache_dir
+    if ready:
+        opts['remote_components'] = []
+    else:
+        opts['remote_components'] = ['ejs:github']
+        _start_component_refresh()
+    return opts
+
+
+def seed_component_cache(bundled_dir):
+    """
+    Install solver scripts from a bundled directory into the component cache.
+
+    Args:
+        bundled_dir (str): Directory containing yt.solver.lib.min.js and
+            yt.solver.core.min.js
+
+    Returns:
+        str: JSON with the installed script kinds or error
+    """
+    with _EJS_LOCK:
+        cache_dir = _EJS_STATE['cache_dir']
+    if not cache_dir:
+        return json.dumps({
+            'success': False,
+            'error': 'Component cache is not configured',
+        })
+
+    installed = []
+    errors = {}
+    for kind, filename in _EJS_SCRIPTS.items():
+        try:
+            with open(os.path.join(bundled_dir, filename), encoding='utf-8') as f:
+                _install_ejs_script(cache_dir, kind, f.read())
+            installed.append(kind)
+        except Exception as e:
+            errors[kind] = str(e)
+
+    ready = _set_ejs_ready(cache_dir)
+
+    return json.dumps({
+        'success': not errors,
+        'installed': installed,
+        'errors': errors,
+        'ready': ready,
+    })
+
+
+def configure_component_cache(cache_dir, bundled_dir=None, refresh=True):
+    """
+    Enable the local cache for remote EJS JavaScript solver components.
+
+    Args:
+        cache_dir (str): App storage directory used as yt-dlp's cache dir
+        bundled_dir (str): Optional directory with bundled scripts to seed from
+        refresh (bool): Fetch missing or outdated scripts in the background
+
+    Returns:
+        str: JSON describing the cache state
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with _EJS_LOCK:
+            _EJS_STATE['cache_dir'] = cache_dir
+        ready = _set_ejs_ready(cache_dir)
+
+        if not ready and bundled_dir:
+            ready = json.loads(seed_component_cache(bundled_dir))['ready']
+        if not ready and refresh:
+            _start_component_refresh(force=True)
+
+        return get_component_cache_status()
+    except Exception as e:
+        return json.dumps({
+            'success': False,
+            'error': str(e),
+        })
+
+
+def get_component_cache_status():
+    """
+    Report the state of the EJS component cache.
+
+    Returns:
+        str: JSON with version, readiness and last refresh details
+    """
+    with _EJS_LOCK:
+        state = dict(_EJS_STATE)
+    return json.dumps({
+        'success': True,
+        'version': _EJS_VERSION,
+        'cache_dir': state['cache_dir'],
+        'ready': state['ready'],
+        'refreshing': state['refreshing'],
+        'last_refresh': state['last_refresh'] or None,
+        'last_error': state['last_error'],
+    })
+
+
+# ============================================================================
+# DISK WRITE PATH
+# ============================================================================
+
+# How downloads hit the disk. The defaults favour flash storage and SD cards:
+# - preallocate: reserve the full size of plain HTTP downloads up front with
+#   fallocate(FALLOC_FL_KEEP_SIZE), so the file is laid out contiguously but
+#   its visible size (which yt-dlp uses to resume) still grows with the data
+# - buffer_size: first read/write block; yt-dlp grows it up to 4 MB from here
+#   instead of starting at 1 KB
+# - part_files: False writes straight to the destination name (no rename)
+# Temp files always stay next to the output, so the final rename never
+# becomes a cross-filesystem copy.
+_WRITE_PATH = {'preallocate': True, 'buffer_size': 256 * 1024, 'part_files': True}
+
+_FALLOC_FL_KEEP_SIZE = 0x01
+
+
+def _load_fallocate():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+    except OSError:
+        return None
+    func = getattr(libc, 'fallocate64', None) or getattr(libc, 'fallocate', None)
+    if func is None:
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+    func.restype = ctypes.c_int
+    return func
+
+
+_fallocate = _load_fallocate()
+
+
+def _preallocate(target, size):
+    """
+    Reserve disk blocks for a file without changing its size.
 
+    Args:
+        target: Open file descriptor or path
+        size (int): Total bytes the file will hold
+
+    Returns:
+        bool: True if the blocks were reserved
+    """
+    if _fallocate is None or not size or size <= 0:
+        return False
+    fd = target if isinstance(target, int) else None
+    try:
+        if fd is None:
+            fd = os.open(target, os.O_WRONLY)
+        return _fallocate(fd, _FALLOC_FL_KEEP_SIZE, 0, int(size)) == 0
+    except OSError:
+        return False
+    finally:
+        if fd is not None and not isinstance(target, int):
+            os.close(fd)
+
+
+class _Preallocator:
+    """Preallocate each plain HTTP download once its exact size is known."""
+
+    def __init__(self):
+        self._done = set()
+
+    def observe(self, d):
+        if not _WRITE_PATH['preallocate'] or d.get('status') != 'downloading':
+            return
+        # Fragment totals are estimates; blocks reserved past the real end
+        # would stay allocated, so only exact single-file sizes qualify
+        if d.get('fragment_index') is not None or not d.get('total_bytes'):
+            return
+        path = d.get('tmpfilename') or d.get('filename')
+        if not path or path in self._done:
+            return
+        self._done.add(path)
+        _preallocate(path, d['total_bytes'])
+
+
+def _apply_write_path(opts):
+    opts['buffersize'] = _WRITE_PATH['buffer_size']
+    opts['nopart'] = not _WRITE_PATH['part_files']
     return opts
 
 
+def configure_write_path(preallocate=None, buffer_size=None, part_files=None):
+    """
+    Configure how downloads are written to disk.
+
+    Args:
+        preallocate (bool): Reserve the full file size up front when known
+        buffer_size (int): Initial download block size in bytes
+        part_files (bool): Write to .part files and rename when complete
+
+    Returns:
+        str: JSON with the active write path settings
+    """
+    if preallocate is not None:
+        _WRITE_PATH['preallocate'] = bool(preallocate)
+    if buffer_size:
+        _WRITE_PATH['buffer_size'] = max(1024, int(buffer_size))
+    if part_files is not None:
+        _WRITE_PATH['part_files'] = bool(part_files)
+    return json.dumps({
+        'success': True,
+        **_WRITE_PATH,
+        'preallocate_supported': _fallocate is not None,
+    })
+
+
+# ============================================================================
+# STREAMING INTEGRITY HASHES
+# ============================================================================
+
+# Digests are computed from the bytes as yt-dlp writes them, so reporting a
+# SHA-256 costs no extra read of the finished file. A YoutubeDL opts dict
+# opts in by carrying a _StreamHashes registry under _STREAM_HASHES_PARAM.
+# Only a resumed .part prefix, or an output a post-processor rewrote (e.g. an
+# ffmpeg merge), is read back from disk. The write hook on yt-dlp's
+# FileDownloader is installed by the first _StreamHashes, so downloads never
+# go through it unless hashing was asked for.
+_STREAM_HASHES_PARAM = '_bridge_stream_hashes'
+_HASH_READ_CHUNK = 1024 * 1024
+_HASH_HOOK_LOCK = threading.Lock()
+_original_sanitize_open = None
+
+
+def _hash_file(path, algorithm, limit=None):
+    """Hash a file (or its first limit bytes) from disk."""
+    hasher = hashlib.new(algorithm)
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(_HASH_READ_CHUNK if remaining is None else min(_HASH_READ_CHUNK, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return hasher
+
+
+class _HashingStream:
+    """File proxy that feeds every write into a running digest."""
+
+    def __init__(self, stream, entry):
+        self._stream = stream
+        self._entry = entry
+
+    def write(self, data):
+        self._entry['hash'].update(data)
+        self._entry['bytes'] += len(data)
+        return self._stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _StreamHashes:
+    """Per-call registry of digests for every stream written to disk."""
+
+    def __init__(self, algorithm='sha256'):
+        self.algorithm = algorithm
+        _install_hashing_open()
+        self._lock = threading.Lock()
+        self._open = {}      # path being written -> entry
+        self._finished = {}  # final path -> {'digest', 'bytes', 'stamp'}
+
+    def wrap(self, stream, filename, open_mode):
+        entry = {'hash': hashlib.new(self.algorithm), 'bytes': 0}
+        if 'a' in open_mode and os.path.exists(filename):
+            # Resumed download: the bytes already on disk are part of the file
+            size = os.path.getsize(filename)
+            entry['hash'] = _hash_file(filename, self.algorithm, limit=size)
+            entry['bytes'] = size
+        with self._lock:
+            self._open[filename] = entry
+        return _HashingStream(stream, entry)
+
+    def finish(self, final, written=None):
+        """Record the digest of a stream that has been renamed to final."""
+        with self._lock:
+            entry = None
+            for candidate in (written, final + '.part', final):
+                if candidate and candidate in self._open:
+                    entry = self._open.pop(candidate)
+                    break
+            if entry is None:
+                return
+        try:
+            st = os.stat(final)
+        except OSError:
+            return
+        with self._lock:
+            self._finished[final] = {
+                'digest': entry['hash'].hexdigest(),
+                'bytes': entry['bytes'],
+                'stamp': (st.st_size, st.st_mtime_ns),
+            }
+
+    def observe(self, d):
+        if d.get('status') == 'finished' and d.get('filename'):
+            self.finish(d['filename'], d.get('tmpfilename'))
+
+    def report(self, filenames):
+        """
+        Build the integrity section of a download result.
+
+        Final files whose size and mtime still match what was streamed use the
+        streamed digest; anything a post-processor rewrote is hashed again.
+        """
+        with self._lock:
+            finished = dict(self._finished)
+
+        files = {}
+        for name in filenames:
+            if not name:
+                continue
+            try:
+                st = os.stat(name)
+            except OSError:
+                continue
+            streamed = finished.get(name)
+            if streamed and streamed['stamp'] == (st.st_size, st.st_mtime_ns):
+                files[name] = {self.algorithm: streamed['digest'], 'bytes': streamed['bytes'],
+                               'source': 'stream'}
+            else:
+                files[name] = {self.algorithm: _hash_file(name, self.algorithm).hexdigest(),
+                               'bytes': st.st_size, 'source': 'rehash'}
+
+        return {
+            'algorithm': self.algorithm,
+            'files': files,
+            'streams': [
+                {'filename': name, self.algorithm: entry['digest'], 'bytes': entry['bytes']}
+                for name, entry in finished.items()
+            ],
+        }
+
+
+def _hashing_sanitize_open(self, filename, open_mode):
+    stream, filename = _original_sanitize_open(self, filename, open_mode)
+    hashes = self.params.get(_STREAM_HASHES_PARAM)
+    # Only binary writes of whole streams; fragment scratch files are skipped
+    # because their bytes reach the destination stream through append anyway
+    if (hashes is not None and 'b' in open_mode and ('w' in open_mode or 'a' in open_mode)
+            and filename != '-' and '-Frag' not in filename):
+        stream = hashes.wrap(stream, filename, open_mode)
+    return stream, filename
+
+
+def _install_hashing_open():
+    """Route yt-dlp's file opens through _hashing_sanitize_open, once."""
+    global _original_sanitize_open
+    with _HASH_HOOK_LOCK:
+        if _original_sanitize_open is None:
+            _original_sanitize_open = FileDownloader.sanitize_open
+            FileDownloader.sanitize_open = _hashing_sanitize_open
+
+
+# ============================================================================
+# STORAGE ADMISSION
+# ============================================================================
+
+# Every item is sized after format selection and admitted against the free
+# space of its filesystem before any bytes are fetched. Admitted sizes stay
+# reserved until the item is on disk, so concurrent tasks cannot each see the
+# same free space. Items that do not fit are rejected with STORAGE_FULL; with
+# the 'queue' policy they instead wait for other tasks to release their
+# reservations, unless nothing is in flight to wait for.
+# The ledger lives in the process that runs the download: in process
+# execution mode each worker only sees its own tasks' reservations, so
+# concurrent tasks on different workers can still overcommit the disk.
+_STORAGE_ADMISSION = {
+    'policy': 'reject',       # 'reject', 'queue' or 'off'
+    'headroom_bytes': 64 * 1024 * 1024,
+    'max_wait': 300,          # seconds an item may wait for space
+}
+_STORAGE_COND = threading.Condition()
+_STORAGE_RESERVED = {}        # st_dev -> {(owner, key): bytes}
+_STORAGE_ESTIMATE_MARGIN = 0.05
+
+
+class _StorageRejected(DownloadCancelled):
+    msg = 'Not enough storage space'
+
+    def __init__(self, needed, available):
+        super().__init__(f'Not enough storage space: need {needed} bytes, {available} available')
+        self.needed = needed
+        self.available = available
+
+
+def _existing_dir(path):
+    """Nearest existing directory at or above path."""
+    path = os.path.abspath(path or '.')
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _estimate_download_size(info, rewrites=False):
+    """
+    Estimate the peak disk usage of downloading one resolved item.
+
+    Uses filesize, then filesize_approx, then tbr x duration per selected
+    format. Merging (or any post-processor that rewrites the file) needs room
+    for the output while the inputs still exist, so the peak is doubled.
+
+    Returns:
+        int: Estimated bytes, or None when nothing is known about the size
+    """
+    formats = info.get('requested_formats') or [info]
+    duration = info.get('duration')
+    total, exact = 0, True
+    for fmt in formats:
+        size = fmt.get('filesize')
+        if not size:
+            exact = False
+            size = fmt.get('filesize_approx')
+            if not size and fmt.get('tbr') and duration:
+                size = fmt['tbr'] * 1000 / 8 * duration
+        if not size:
+            return None
+        total += size
+    if not exact:
+        total *= 1 + _STORAGE_ESTIMATE_MARGIN
+    if len(formats) > 1 or rewrites:
+        total *= 2
+    return int(total)
+
+
+class _StorageReservation:
+    """One task's share of the storage ledger for a single output directory."""
+
+    def __init__(self, output_path, task_id=None):
+        self._path = _existing_dir(output_path)
+        self._device = os.stat(self._path).st_dev
+        self._owner = task_id or uuid.uuid4().hex
+        self._admitted = {}   # key -> bytes admitted
+        self._landed = {}     # key -> {file: bytes written}
+        self.reserved = 0
+
+    def _others(self, ledger):
+        return sum(b for (owner, _), b in ledger.items() if owner != self._owner)
+
+    def admit(self, key, size):
+        """
+        Reserve size bytes under key, replacing any earlier reservation for it.
+
+        Raises:
+            _StorageRejected: When the item does not fit and cannot wait
+        """
+        policy = _STORAGE_ADMISSION['policy']
+        if policy == 'off' or not size:
+            return
+        deadline = time.monotonic() + (_STORAGE_ADMISSION['max_wait'] or 0)
+        with _STORAGE_COND:
+            ledger = _STORAGE_RESERVED.setdefault(self._device, {})
+            ledger.pop((self._owner, key), None)
+            while True:
+                own = sum(b for (owner, _), b in ledger.items() if owner == self._owner)
+                others = self._others(ledger)
+                available = (shutil.disk_usage(self._path).free - others - own
+                             - _STORAGE_ADMISSION['headroom_bytes'])
+                if size <= available:
+                    ledger[(self._owner, key)] = size
+                    self._admitted[key] = size
+                    self._landed[key] = {}
+                    self.reserved = own + size
+                    return
+                remaining = deadline - time.monotonic()
+                # Waiting only helps if another task will release space
+                if policy != 'queue' or not others or remaining <= 0:
+                    raise _StorageRejected(size, max(0, int(available)))
+                _STORAGE_COND.wait(min(remaining, 5))
+
+    def progress(self, key, written, part=None):
+        """
+        Shrink the reservation for key as its bytes land on disk.
+
+        Written bytes already count against free space, so keeping them
+        reserved as well would charge them twice. part tells apart the
+        files of one key (e.g. the video and audio of a merged download).
+        """
+        with _STORAGE_COND:
+            ledger = _STORAGE_RESERVED.get(self._device, {})
+            if (self._owner, key) not in ledger:
+                return
+            landed = self._landed.setdefault(key, {})
+            landed[part] = written
+            remaining = max(0, self._admitted.get(key, 0) - sum(landed.values()))
+            self.reserved += remaining - ledger[(self._owner, key)]
+            ledger[(self._owner, key)] = remaining
+
+    def settle(self, key):
+        """Drop the reservation for key once its bytes are on disk."""
+        with _STORAGE_COND:
+            ledger = _STORAGE_RESERVED.get(self._device, {})
+            self._admitted.pop(key, None)
+            self._landed.pop(key, None)
+            if ledger.pop((self._owner, key), None) is not None:
+                self.reserved = sum(b for (owner, _), b in ledger.items() if owner == self._owner)
+                _STORAGE_COND.notify_all()
+
+    def release(self):
+        with _STORAGE_COND:
+            ledger = _STORAGE_RESERVED.get(self._device, {})
+            for k in [k for k in ledger if k[0] == self._owner]:
+                del ledger[k]
+            self._admitted.clear()
+            self._landed.clear()
+            self.reserved = 0
+            _STORAGE_COND.notify_all()
+
+
+class _AdmissionPP(PostProcessor):
+    """before_dl hook that admits each item once its formats are selected."""
+
+    def __init__(self, downloader, reservation):
+        super().__init__(downloader)
+        self._reservation = reservation
+
+    def run(self, info):
+        params = self._downloader.params
+        rewrites = bool(params.get('embedsubtitles') or params.get('postprocessors'))
+        size = _estimate_download_size(info, rewrites=rewrites)
+        if size:
+            # The previous item has finished post-processing by now, so one
+            # key per task is enough to reserve the item in flight
+            self._reservation.admit('ytdl', size)
+        return [], info
+
+
+def configure_storage_admission(policy=None, headroom_bytes=None, max_wait=None):
+    """
+    Configure pre-flight disk space admission.
+
+    Args:
+        policy (str): 'reject' to fail items that do not fit (the default),
+            'queue' to wait for space held by other tasks, or 'off' to
+            disable admission
+        headroom_bytes (int): Free space always left untouched
+        max_wait (int): Seconds a queued item waits before it is rejected
+
+    Returns:
+        str: JSON with the active settings
+    """
+    if policy is not None:
+        if policy not in ('reject', 'queue', 'off'):
+            return json.dumps({'success': False, 'error': f'Unknown policy: {policy}'})
+        _STORAGE_ADMISSION['policy'] = policy
+    if headroom_bytes is not None:
+        _STORAGE_ADMISSION['headroom_bytes'] = max(0, int(headroom_bytes))
+    if max_wait is not None:
+        _STORAGE_ADMISSION['max_wait'] = max(0, int(max_wait))
+    return json.dumps({'success': True, **_STORAGE_ADMISSION})
+
+
+def get_storage_status(output_path):
+    """
+    Report free space and outstanding reservations for output_path.
+
+    Returns:
+        str: JSON with free, reserved and admittable bytes
+    """
+    try:
+        path = _existing_dir(output_path)
+        device = os.stat(path).st_dev
+        free = shutil.disk_usage(path).free
+        with _STORAGE_COND:
+            ledger = dict(_STORAGE_RESERVED.get(device, {}))
+        reserved = sum(ledger.values())
+        return json.dumps({
+            'success': True,
+            'free_bytes': free,
+            'reserved_bytes': reserved,
+            'available_bytes': max(0, free - reserved - _STORAGE_ADMISSION['headroom_bytes']),
+            'reservations': len(ledger),
+            **_STORAGE_ADMISSION,
+        })
+    except Exception as e:
+        return json.dumps({'success': False, 'error': str(e)})
+
+
+# ============================================================================
+# DOWNLOAD ARCHIVE
+# ============================================================================
+
+# Finished items are recorded as "<extractor> <id> <format selector>" keys so
+# resubmitting a URL skips them before any per-item extraction. The archive
+# file is append-only, holding one "<key digest> <output path>" line per
+# finished item, and is mirrored in an in-memory dict for O(1) lookups. An
+# entry whose file has since been deleted counts as a miss, so the item is
+# downloaded again. Records appended by other processes are picked up from
+# the file tail on the next lookup. The archive stays off until a path is
+# configured, so nothing is recorded in a shared temp directory.
+_ARCHIVE_STATE = {
+    'path': None,
+    'enabled': False,
+}
+# blake2b digest bytes per key; written as 32 hex characters, so a record is
+# 34 bytes plus its output path (about 10 MB per 100k records with typical
+# Android download paths)
+_ARCHIVE_DIGEST_SIZE = 16
+_ARCHIVE_INDEXES = {}
+_ARCHIVE_LOCK = threading.Lock()
+
+# Extractors whose ids are derived from the URL basename, so unrelated URLs
+# such as http://host/a.bin and http://host/other/a.bin share an id
+_ARCHIVE_UNSTABLE_IDS = ('generic', 'html5mediaembed')
+
+
+class _ArchiveIndex:
+    """Map of archive key digests to output paths, backed by an append-only file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._files = {}
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=_ARCHIVE_DIGEST_SIZE).hexdigest()
+
+    def _refresh(self):
+        """Load records appended since the last read. Caller holds the lock."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        size = st.st_size
+        if size < self._offset or st.st_ino != self._inode:
+            # File was replaced or truncated; start over
+            self._files.clear()
+            self._offset = 0
+            self._inode = st.st_ino
+        if size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # Only complete lines; a record still being appended is read next time
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            digest, _, filename = line.decode('utf-8', 'replace').partition(' ')
+            if len(digest) == _ARCHIVE_DIGEST_SIZE * 2 and filename:
+                # Later records win, so a re-download updates the path
+                self._files[digest] = filename
+        self._offset += end
+
+    def get(self, key):
+        """Return the recorded output path for key, or None."""
+        digest = self._digest(key)
+        with self._lock:
+            self._refresh()
+            return self._files.get(digest)
+
+    def add(self, key, filename):
+        digest = self._digest(key)
+        with self._lock:
+            self._refresh()
+            if self._files.get(digest) == filename:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # O_APPEND with a single write keeps concurrent records from
+            # interleaving. The offset only moves past this record when
+            # nothing else was appended since the refresh; otherwise the next
+            # refresh re-reads it along with what other processes appended.
+            line = f'{digest} {filename}\n'.encode()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                st = os.fstat(fd)
+            finally:
+                os.close(fd)
+            if st.st_ino != self._inode:
+                # Created just now: the next refresh reads it from the start
+                self._files.clear()
+                self._offset = 0
+                self._inode = st.st_ino
+            elif st.st_size == self._offset + len(line):
+                self._offset = st.st_size
+            self._files[digest] = filename
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._files)
+
+
+def _get_archive_index():
+    path = _ARCHIVE_STATE['path']
+    with _ARCHIVE_LOCK:
+        index = _ARCHIVE_INDEXES.get(path)
+        if index is None:
+            index = _ARCHIVE_INDEXES[path] = _ArchiveIndex(path)
+        return index
+
+
+class _ArchiveView:
+    """
+    The download_archive container handed to yt-dlp for one call.
+
+    yt-dlp looks up and records "<extractor> <id>" strings; the view scopes
+    them to the call's format selector so an audio-only download does not
+    hide the video download of the same item. A hit only counts while the
+    recorded file still exists. Hits are kept for reporting.
+    """
+
+    def __init__(self, index, profile, skip=True):
+        self._index = index
+        self._profile = profile
+        self._skip = skip
+        self._skipped = {}
+        self._outputs = {}
+
+    def _key(self, archive_id):
+        return f'{archive_id} {self._profile}'
+
+    @staticmethod
+    def _trackable(archive_id):
+        return archive_id.partition(' ')[0] not in _ARCHIVE_UNSTABLE_IDS
+
+    def __bool__(self):
+        # yt-dlp only consults a truthy archive; recording always happens
+        return self._skip
+
+    def __contains__(self, archive_id):
+        if not self._trackable(archive_id):
+            return False
+        filename = self._index.get(self._key(archive_id))
+        if filename and os.path.exists(filename):
+            self._skipped.setdefault(archive_id, filename)
+            return True
+        return False
+
+    def note_output(self, archive_id, filename):
+        """Remember where an item landed; yt-dlp's add() only passes the id."""
+        self._outputs[archive_id] = filename
+
+    def add(self, archive_id):
+        filename = self._outputs.get(archive_id)
+        if filename and '\n' not in filename and self._trackable(archive_id):
+            self._index.add(self._key(archive_id), os.path.abspath(filename))
+
+    def was_skipped(self, archive_id):
+        return archive_id in self._skipped
+
+    def skipped_filename(self, archive_id):
+        return self._skipped.get(archive_id)
+
+    @property
+    def skipped(self):
+        result = []
+        for archive_id, filename in self._skipped.items():
+            extractor, _, video_id = archive_id.partition(' ')
+            result.append({'extractor': extractor, 'id': video_id, 'filename': filename})
+        return result
+
+
+class _ArchiveOutputPP(PostProcessor):
+    """Hands each item's final path to the archive view once it is moved into place."""
+
+    def __init__(self, downloader, view):
+        super().__init__(downloader)
+        self._view = view
+
+    def run(self, info):
+        archive_id = self._downloader._make_archive_id(info)
+        if archive_id and info.get('filepath'):
+            self._view.note_output(archive_id, info['filepath'])
+        return [], info
+
+
+def configure_download_archive(path=None, enabled=None):
+    """
+    Configure the persistent download archive.
+
+    The archive is disabled until a path is set; setting one enables it
+    unless enabled=False is passed as well.
+
+    Args:
+        path (str): Archive index file
+        enabled (bool): Record and skip downloaded items
+
+    Returns:
+        str: JSON with the archive path, state and entry count
+    """
+    if path:
+        _ARCHIVE_STATE['path'] = path
+        if enabled is None:
+            enabled = True
+    if enabled and not _ARCHIVE_STATE['path']:
+        return json.dumps({'success': False, 'error': 'Download archive path is not configured'})
+    if enabled is not None:
+        _ARCHIVE_STATE['enabled'] = bool(enabled)
+    return get_download_archive_status()
+
+
+def get_download_archive_status():
+    """
+    Report the download archive location and size.
+
+    Returns:
+        str: JSON with path, enabled flag, entries and file size
+    """
+    try:
+        path = _ARCHIVE_STATE['path']
+        return json.dumps({
+            'success': True,
+            'path': path,
+            'enabled': _ARCHIVE_STATE['enabled'],
+            'entries': len(_get_archive_index()) if path else 0,
+            'file_bytes': os.path.getsize(path) if path and os.path.exists(path) else 0,
+        })
+    except Exception as e:
+        return json.dumps({'success': False, 'error': str(e)})
+
+
+# ============================================================================
+# TASK SCHEDULER
+# ============================================================================
+
+# download_media admits each call by priority class before doing any work,
+# with a separate concurrency limit per class. While an interactive task is
+# queued or running, background tasks are not admitted and running ones pause
+# at their next fragment boundary (single-stream HTTP downloads keep going,
+# as pausing them would hold an idle connection open). They resume as soon
+# as no interactive task is left. 'normal' is unlimited by default: that is
+# the class every app download uses, and the app caps its own concurrency
+# (up to 6), so a lower limit here would stall downloads without feedback.
+# In process mode admission still happens in this process, but pausing does
+# not: the download runs in a worker, so a running background task keeps
+# going and only new ones wait.
+_PRIORITY_CLASSES = ('interactive', 'normal', 'background')
+_SCHEDULER_STATE = {
+    'enabled': True,
+    'limits': {'interactive': 2, 'normal': None, 'background': 2},
+}
+_SCHEDULER_COND = threading.Condition()
+_SCHEDULER_RUNNING = dict.fromkeys(_PRIORITY_CLASSES, 0)
+_SCHEDULER_WAITING = dict.fromkeys(_PRIORITY_CLASSES, 0)
+_SCHEDULER_PREADMITTED = {}  # task_id -> _Ticket admitted before the call ran
+_SCHEDULER_ASYNC_WAITERS = {}  # future -> event loop of a coroutine queued for admission
+_SCHEDULER_STATS = {
+    cls: {
+        'admitted': 0,
+        'wait_seconds': 0.0,
+        'max_wait': 0.0,
+        'recent_waits': collections.deque(maxlen=256),
+        'preemptions': 0,
+        'paused_seconds': 0.0,
+    }
+    for cls in _PRIORITY_CLASSES
+}
+
+
+def _interactive_active():
+    """Caller holds _SCHEDULER_COND."""
+    return _SCHEDULER_RUNNING['interactive'] + _SCHEDULER_WAITING['interactive'] > 0
+
+
+def _wake_future(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _notify_scheduler():
+    """Wake threads and coroutines waiting on the scheduler. Caller holds _SCHEDULER_COND."""
+    _SCHEDULER_COND.notify_all()
+    waiters = list(_SCHEDULER_ASYNC_WAITERS.items())
+    _SCHEDULER_ASYNC_WAITERS.clear()
+    for future, loop in waiters:
+        try:
+            loop.call_soon_threadsafe(_wake_future, future)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+
+class _Ticket:
+    """A slot held by one admitted task."""
+
+    def __init__(self, priority, task_id):
+        self.priority = priority
+        self.task_id = task_id
+        self._fragment = None
+        self._released = False
+
+    def checkpoint(self, d):
+        """Progress hook step: park a background task at a fragment boundary."""
+        if self.priority != 'background':
+            return
+        index = d.get('fragment_index')
+        if index is None or index == self._fragment:
+            return
+        self._fragment = index
+        with _SCHEDULER_COND:
+            if not _interactive_active():
+                return
+            stats = _SCHEDULER_STATS['background']
+            stats['preemptions'] += 1
+            paused = time.monotonic()
+            while _interactive_active():
+                # Cancellation is raised by the progress hook right after
+                if self.task_id and _is_cancelled(self.task_id):
+                    break
+                _SCHEDULER_COND.wait(1)
+            stats['paused_seconds'] += time.monotonic() - paused
+
+    def release(self):
+        with _SCHEDULER_COND:
+            if self._released:
+                return
+            self._released = True
+            _SCHEDULER_RUNNING[self.priority] -= 1
+            _notify_scheduler()
+
+
+def _admissible(priority):
+    """Caller holds _SCHEDULER_COND."""
+    limit = _SCHEDULER_STATE['limits'].get(priority)
+    full = bool(limit) and _SCHEDULER_RUNNING[priority] >= limit
+    yield_to_interactive = priority == 'background' and _interactive_active()
+    return not full and not yield_to_interactive
+
+
+def _grant_ticket(priority, task_id, queued):
+    """Start a task that has left the queue. Caller holds _SCHEDULER_COND."""
+    _SCHEDULER_RUNNING[priority] += 1
+    waited = time.monotonic() - queued
+    stats = _SCHEDULER_STATS[priority]
+    stats['admitted'] += 1
+    stats['wait_seconds'] += waited
+    stats['max_wait'] = max(stats['max_wait'], waited)
+    stats['recent_waits'].append(waited)
+    return _Ticket(priority, task_id)
+
+
+def _admit_task(priority, task_id=None, queued=None):
+    """
+    Block until a task of this class may start.
+
+    Args:
+        queued (float): time.monotonic() of job submission, if earlier than now
+
+    Returns:
+        _Ticket: The admitted slot, or None if the task was cancelled while queued
+    """
+    queued = queued or time.monotonic()
+    with _SCHEDULER_COND:
+        _SCHEDULER_WAITING[priority] += 1
+        try:
+            while True:
+                if task_id and _is_cancelled(task_id):
+                    _clear_cancelled(task_id)
+                    return None
+                if _admissible(priority):
+                    break
+                _SCHEDULER_COND.wait(1)
+        finally:
+            _SCHEDULER_WAITING[priority] -= 1
+            # Background tasks parked for a queued interactive one may go on
+            _notify_scheduler()
+        return _grant_ticket(priority, task_id, queued)
+
+
+async def _admit_task_async(priority, task_id, queued):
+    """
+    Coroutine version of _admit_task that waits on the event loop.
+
+    No thread is held while queued, so any number of jobs can wait without
+    starving the executor an admitted job needs. The ticket is left for
+    download_media to pick up.
+
+    Returns:
+        _Ticket: The admitted slot, or None if the task was cancelled while queued
+    """
+    loop = asyncio.get_running_loop()
+    wake = None
+    waiting = True
+    with _SCHEDULER_COND:
+        _SCHEDULER_WAITING[priority] += 1
+    try:
+        while True:
+            with _SCHEDULER_COND:
+                if _is_cancelled(task_id):
+                    _clear_cancelled(task_id)
+                    return None
+                if _admissible(priority):
+                    _SCHEDULER_WAITING[priority] -= 1
+                    waiting = False
+                    ticket = _grant_ticket(priority, task_id, queued)
+                    _SCHEDULER_PREADMITTED[task_id] = ticket
+                    _notify_scheduler()
+                    return ticket
+                wake = loop.create_future()
+                _SCHEDULER_ASYNC_WAITERS[wake] = loop
+            # The timeout mirrors _admit_task's periodic re-check
+            await asyncio.wait({wake}, timeout=1)
+    finally:
+        with _SCHEDULER_COND:
+            _SCHEDULER_ASYNC_WAITERS.pop(wake, None)
+            if waiting:
+                _SCHEDULER_WAITING[priority] -= 1
+                _notify_scheduler()
+
+
+def _take_preadmitted(task_id):
+    if not task_id:
+        return None
+    with _SCHEDULER_COND:
+        return _SCHEDULER_PREADMITTED.pop(task_id, None)
+
+
+def _drop_preadmitted(task_id):
+    """Give back a slot admitted for a call that will never run."""
+    ticket = _take_preadmitted(task_id)
+    if ticket:
+        _clear_cancelled(task_id)
+        ticket.release()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+def configure_scheduler(limits=None, enabled=None):
+    """
+    Configure priority scheduling of downloads.
+
+    Args:
+        limits (dict): Concurrent tasks per class, e.g. {'background': 1};
+            0 or None means unlimited
+        enabled (bool): Admit tasks through the scheduler
+
+    Pausing running background tasks only works in thread mode; with
+    configure_execution_mode('process') the limits still apply but running
+    tasks are not paused.
+
+    Returns:
+        str: JSON with the active settings
+    """
+    with _SCHEDULER_COND:
+        for cls, limit in (limits or {}).items():
+            if cls not in _PRIORITY_CLASSES:
+                return json.dumps({'success': False, 'error': f'Unknown priority: {cls}'})
+            _SCHEDULER_STATE['limits'][cls] = max(0, int(limit)) if limit else None
+        if enabled is not None:
+            _SCHEDULER_STATE['enabled'] = bool(enabled)
+        _notify_scheduler()
+        return json.dumps({
+            'success': True,
+            'enabled': _SCHEDULER_STATE['enabled'],
+            'limits': dict(_SCHEDULER_STATE['limits']),
+        })
+
+
+def get_scheduler_stats():
+    """
+    Report running/queued tasks and queue wait times per priority class.
+
+    Returns:
+        str: JSON with per-class counters; waits are in seconds, percentiles
+            cover the most recent admissions
+    """
+    with _SCHEDULER_COND:
+        classes = {}
+        for cls in _PRIORITY_CLASSES:
+            stats = _SCHEDULER_STATS[cls]
+            recent = list(stats['recent_waits'])
+            classes[cls] = {
+                'limit': _SCHEDULER_STATE['limits'].get(cls),
+                'running': _SCHEDULER_RUNNING[cls],
+                'queued': _SCHEDULER_WAITING[cls],
+                'admitted': stats['admitted'],
+                'mean_wait': round(stats['wait_seconds'] / stats['admitted'], 3) if stats['admitted'] else None,
+                'p50_wait': _percentile(recent, 0.5),
+                'p95_wait': _percentile(recent, 0.95),
+                'max_wait': round(stats['max_wait'], 3),
+                'preemptions': stats['preemptions'],
+                'paused_seconds': round(stats['paused_seconds'], 3),
+            }
+        return json.dumps({
+            'success': True,
+            'enabled': _SCHEDULER_STATE['enabled'],
+            'classes': classes,
+        })
+
+
+# ============================================================================
+# CALL PROFILING
+# ============================================================================
+
+# get_media_info and download_media can be captured with cProfile and
+# tracemalloc, either per call (profile=True) or for a random sample of calls
+# (configure_profiling(sample_rate=...)). Unsampled calls pay one random()
+# check. One capture runs at a time and calls arriving meanwhile are not
+# profiled. cProfile only follows the thread that made the call: work yt-dlp
+# hands to its own threads (concurrent fragment downloads) shows up as time
+# spent waiting on them. tracemalloc is process-wide, so allocations made by
+# other threads during a capture are attributed to it; it is only on for
+# sampled captures when configured, and always for explicit profile=True.
+# download_media starts its capture once the scheduler has admitted it, so
+# queue time is neither profiled nor holding up other captures. Each capture
+# is written as a small JSON artifact, and the oldest artifacts are deleted
+# past max_bytes.
+_PROFILING = {
+    'sample_rate': 0.0,
+    'output_dir': os.path.join(tempfile.gettempdir(), 'ytdlp_profiles'),
+    'max_bytes': 5 * 1024 * 1024,
+    'top_n': 25,
+    'memory': False,
+}
+_PROFILE_CAPTURE_LOCK = threading.Lock()
+# forward: profile value to pass on to the worker process
+# admitted: tracemalloc flag for a capture download_media starts after admission
+_PROFILE_LOCAL = threading.local()
+
+
+def _short_path(path):
+    """Trim a source path to the part after site-packages (or its last two parts)."""
+    marker = 'site-packages' + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    return os.sep.join(path.split(os.sep)[-2:])
+
+
+def _cpu_profile_summary(profiler, top_n):
+    stats = pstats.Stats(profiler).stats
+    rows = [
+        {
+            'function': f'{_short_path(file)}:{line}({name})',
+            'calls': nc,
+            'self_seconds': round(tt, 4),
+            'cumulative_seconds': round(ct, 4),
+        }
+        for (file, line, name), (cc, nc, tt, ct, callers) in stats.items()
+    ]
+    return {
+        'total_calls': sum(row['calls'] for row in rows),
+        'top_self': sorted(rows, key=lambda r: r['self_seconds'], reverse=True)[:top_n],
+        'top_cumulative': sorted(rows, key=lambda r: r['cumulative_seconds'], reverse=True)[:top_n],
+    }
+
+
+def _memory_profile_summary(top_n):
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    return {
+        'peak_bytes': peak,
+        'retained_bytes': current,
+        'top_retained': [
+            {
+                'site': f'{_short_path(trace.traceback[0].filename)}:{trace.traceback[0].lineno}',
+                'bytes': trace.size,
+                'count': trace.count,
+            }
+            for trace in snapshot.statistics('lineno')[:top_n]
+        ],
+    }
+
+
+def _rotate_profiles(output_dir, max_bytes):
+    """Delete the oldest artifacts until the directory fits in max_bytes."""
+    try:
+        entries = [e for e in os.scandir(output_dir) if e.is_file() and e.name.endswith('.json')]
+    except OSError:
+        return
+    stats = sorted((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries)
+    total = sum(size for _, size, _ in stats)
+    # The newest artifact is always kept
+    for _, size, path in stats[:-1]:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def _run_profiled(name, func, args, kwargs, memory):
+    """Run func under cProfile (and tracemalloc if memory) and write the capture to disk."""
+    if not _PROFILE_CAPTURE_LOCK.acquire(blocking=False):
+        return func(*args, **kwargs)
+    try:
+        settings = dict(_PROFILING)
+        tracing = memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif memory:
+            tracemalloc.reset_peak()
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            cpu_enabled = True
+        except ValueError:  # Another profiler (or debugger) is active
+            cpu_enabled = False
+
+        started = time.time()
+        wall = time.monotonic()
+        cpu = time.process_time()
+        result, error = None, None
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if cpu_enabled:
+                profiler.disable()
+            artifact = {
+                'version': 1,
+                'call': name,
+                'url': kwargs.get('url', args[0] if args else None),
+                'task_id': kwargs.get('task_id'),
+                'started': started,
+                'wall_seconds': round(time.monotonic() - wall, 4),
+                'process_cpu_seconds': round(time.process_time() - cpu, 4),
+                'error': error,
+            }
+            try:
+                if cpu_enabled:
+                    artifact['cpu'] = _cpu_profile_summary(profiler, settings['top_n'])
+                if memory and tracemalloc.is_tracing():
+                    artifact['memory'] = _memory_profile_summary(settings['top_n'])
+            finally:
+                if tracing:
+                    tracemalloc.stop()
+
+            path = None
+            try:
+                os.makedirs(settings['output_dir'], exist_ok=True)
+                path = os.path.join(
+                    settings['output_dir'],
+                    f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}"
+                    f"-{name}-{uuid.uuid4().hex[:8]}.json")
+
+                def write(tmp):
+                    with open(tmp, 'w', encoding='utf-8') as f:
+                        json.dump(artifact, f, separators=(',', ':'))
+
+                _write_file_atomic(path, write)
+                _rotate_profiles(settings['output_dir'], settings['max_bytes'])
+            except Exception as e:
+                print(f"Failed to write profile: {e}")
+                path = None
+
+        if path and isinstance(result, str):
+            try:
+                data = json.loads(result)
+                if isinstance(data, dict):
+                    data['profile_artifact'] = path
+                    result = json.dumps(data)
+            except ValueError:
+                pass
+        return result
+    finally:
+        _PROFILE_CAPTURE_LOCK.release()
+
+
+def _profiled(func=None, after_admission=False):
+    """
+    Give a bridge function an opt-in profile keyword (see configure_profiling).
+
+    With after_admission the wrapper only records the request; the function
+    starts the capture itself via _run_admitted_profiled once the scheduler
+    has admitted it. The parent forwards profile='sampled' to a worker for a
+    sampled call, so the worker applies the sampled memory setting.
+    """
+    if func is None:
+        return functools.partial(_profiled, after_admission=after_admission)
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, profile=None, **kwargs):
+        if profile is None:
+            rate = _PROFILING['sample_rate']
+            profile = 'sampled' if rate > 0 and random.random() < rate else False
+        if not profile:
+            return func(*args, **kwargs)
+        if _use_process_pool():
+            # The work happens in a worker process; profile it there
+            _PROFILE_LOCAL.forward = profile
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _PROFILE_LOCAL.forward = False
+        memory = _PROFILING['memory'] if profile == 'sampled' else True
+        if after_admission:
+            _PROFILE_LOCAL.admitted = memory
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _PROFILE_LOCAL.admitted = None
+        return _run_profiled(name, func, args, kwargs, memory)
+
+    return wrapper
+
+
+def _run_admitted_profiled(name, func, kwargs):
+    """Run func, capturing it if the caller's _profiled wrapper asked for it."""
+    memory = getattr(_PROFILE_LOCAL, 'admitted', None)
+    if memory is None:
+        return func(**kwargs)
+    # Nested bridge calls decide for themselves
+    _PROFILE_LOCAL.admitted = None
+    return _run_profiled(name, func, (), kwargs, memory)
+
+
+def configure_profiling(sample_rate=None, output_dir=None, max_bytes=None,
+                        top_n=None, memory=None):
+    """
+    Configure CPU/memory profiling of get_media_info and download_media.
+
+    Individual calls can also pass profile=True (always capture) or
+    profile=False (never capture) regardless of the sample rate.
+
+    Args:
+        sample_rate (float): Fraction of calls to profile (0 disables)
+        output_dir (str): Directory for profile artifacts
+        max_bytes (int): Total artifact size kept before the oldest are deleted
+        top_n (int): Functions and allocation sites listed per artifact
+        memory (bool): Also trace allocations with tracemalloc in sampled
+            captures; explicit profile=True calls always do
+
+    Returns:
+        str: JSON with the active settings
+    """
+    if sample_rate is not None:
+        _PROFILING['sample_rate'] = min(1.0, max(0.0, float(sample_rate)))
+    if output_dir:
+        _PROFILING['output_dir'] = output_dir
+    if max_bytes is not None:
+        _PROFILING['max_bytes'] = max(0, int(max_bytes))
+    if top_n:
+        _PROFILING['top_n'] = max(1, int(top_n))
+    if memory is not None:
+        _PROFILING['memory'] = bool(memory)
+    return json.dumps({'success': True, **_PROFILING})
+
+
+def get_profiling_status():
+    """
+    Report profiling settings and the artifacts currently on disk.
+
+    Returns:
+        str: JSON with settings, artifact count/bytes and the newest artifacts
+    """
+    try:
+        entries = [e for e in os.scandir(_PROFILING['output_dir'])
+                   if e.is_file() and e.name.endswith('.json')]
+    except OSError:
+        entries = []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return json.dumps({
+        'success': True,
+        **_PROFILING,
+        'artifacts': len(entries),
+        'artifact_bytes': sum(e.stat().st_size for e in entries),
+        'recent': [e.path for e in entries[:10]],
+    })
+
+
 def cancel_download(task_id):
     """Mark a task as cancelled so progress hooks can abort it."""
     if task_id:
         _CANCELLED_TASKS.add(task_id)
+        if _PROCESS_POOL is not None:
+            _PROCESS_POOL.cancel(task_id)
+        # Wake tasks queued for admission or paused by preemption
+        with _SCHEDULER_COND:
+            _notify_scheduler()
     return True
 
 
@@ -379,6 +2146,158 @@ def _build_progress_payload(d):
         'item_count': item_count,
     }
 
+# ============================================================================
+# ADAPTIVE THROTTLE DETECTION
+# ============================================================================
+
+# Instead of a fixed rate limit, each download compares its rolling throughput
+# with a baseline learned from the same task and from earlier downloads off the
+# same host. When throughput collapses well below that baseline for a while,
+# ThrottledDownload is raised: yt-dlp then re-extracts a fresh format URL and
+# resumes from the .part file.
+_THROUGHPUT_WINDOW = 5.0          # seconds of samples in the rolling rate
+_THROUGHPUT_WARMUP = 5.0          # ignore the first seconds of each stream
+_THROUGHPUT_GRACE = 8.0           # how long a collapse must last
+_THROUGHPUT_COLLAPSE_RATIO = 0.25 # fraction of baseline that counts as collapse
+_THROUGHPUT_MIN_BASELINE = 64 * 1024
+_THROUGHPUT_EWMA_ALPHA = 0.2
+_THROUGHPUT_BLOCK_SIZE = 64 * 1024  # fixed HTTP read size, so hooks keep firing
+_MAX_RECONNECTS = 3
+
+_HOST_BASELINES = {}
+_THROUGHPUT_STATS = {}
+_THROUGHPUT_LOCK = threading.Lock()
+
+
+def _bump_throughput_stat(host, key):
+    with _THROUGHPUT_LOCK:
+        stats = _THROUGHPUT_STATS.setdefault(host, {
+            'collapses': 0, 'reconnects': 0, 'gave_up': 0,
+        })
+        stats[key] += 1
+
+
+class _ThroughputMonitor:
+    """Track the throughput of one download task and flag collapses."""
+
+    def __init__(self, task_id=None, clock=time.monotonic):
+        self.task_id = task_id
+        self.reconnects = 0
+        self._clock = clock
+        self._reset(None, None)
+
+    def _reset(self, filename, host):
+        self._filename = filename
+        self._host = host
+        self._started = self._clock()
+        self._samples = collections.deque()
+        self._baseline = None
+        self._collapsed_since = None
+        self._gave_up = False
+        if host:
+            with _THROUGHPUT_LOCK:
+                self._baseline = _HOST_BASELINES.get(host)
+
+    def _rate(self, now, downloaded):
+        self._samples.append((now, downloaded))
+        # Keep one sample at or beyond the window edge so sparse hook calls
+        # still measure over a full window
+        while len(self._samples) > 2 and now - self._samples[1][0] >= _THROUGHPUT_WINDOW:
+            self._samples.popleft()
+        first_t, first_b = self._samples[0]
+        if now - first_t < _THROUGHPUT_WINDOW / 2:
+            return None
+        return (downloaded - first_b) / (now - first_t)
+
+    def observe(self, d):
+        """
+        Feed a yt-dlp progress dict.
+
+        Raises:
+            ThrottledDownload: When throughput has collapsed and a reconnect
+                is still allowed for this task
+        """
+        if d.get('status') != 'downloading':
+            if d.get('status') == 'finished' and self._host and self._baseline:
+                with _THROUGHPUT_LOCK:
+                    _HOST_BASELINES[self._host] = self._baseline
+            return
+
+        info = d.get('info_dict') or {}
+        filename = d.get('tmpfilename') or d.get('filename')
+        if filename != self._filename:
+            # After a reconnect the stream resumes under the same task; keep
+            # the baseline it learned before the collapse
+            carried = self._baseline if self._filename is None else None
+            host = urllib.parse.urlparse(info.get('url') or '').hostname
+            self._reset(filename, _cookie_site(host) if host else info.get('extractor_key'))
+            if carried is not None:
+                self._baseline = carried
+        if self._gave_up:
+            return
+
+        downloaded = d.get('downloaded_bytes')
+        if downloaded is None:
+            return
+        now = self._clock()
+        rate = self._rate(now, downloaded)
+        if rate is None or now - self._started < _THROUGHPUT_WARMUP:
+            return
+
+        # Links slower than the minimum baseline are never judged collapsed
+        if (self._baseline is None or self._baseline < _THROUGHPUT_MIN_BASELINE
+                or rate >= self._baseline * _THROUGHPUT_COLLAPSE_RATIO):
+            self._collapsed_since = None
+            if self._baseline is None:
+                self._baseline = rate
+            else:
+                self._baseline += _THROUGHPUT_EWMA_ALPHA * (rate - self._baseline)
+            return
+
+        if self._collapsed_since is None:
+            self._collapsed_since = now
+            _bump_throughput_stat(self._host, 'collapses')
+        if now - self._collapsed_since < _THROUGHPUT_GRACE:
+            return
+
+        if self.reconnects >= _MAX_RECONNECTS:
+            # Out of reconnects: let this file finish at whatever rate it gets
+            _bump_throughput_stat(self._host, 'gave_up')
+            self._gave_up = True
+            return
+
+        self.reconnects += 1
+        _bump_throughput_stat(self._host, 'reconnects')
+        # Start fresh for the re-extracted URL but keep the learned baseline
+        baseline = self._baseline
+        self._reset(None, self._host)
+        self._baseline = baseline
+        raise ThrottledDownload()
+
+
+def get_throughput_stats():
+    """
+    Report throttle detection counters and learned baselines per host.
+
+    Returns:
+        str: JSON with per-host counters and baselines (bytes/s)
+    """
+    with _THROUGHPUT_LOCK:
+        hosts = {
+            host: {**stats, 'baseline': _safe_int(_HOST_BASELINES.get(host))}
+            for host, stats in _THROUGHPUT_STATS.items()
+        }
+        for host, baseline in _HOST_BASELINES.items():
+            hosts.setdefault(host, {
+                'collapses': 0, 'reconnects': 0, 'gave_up': 0,
+                'baseline': _safe_int(baseline),
+            })
+    return json.dumps({
+        'success': True,
+        'hosts': hosts,
+    })
+
+
 def get_video_info(url):
     """
     Extract video metadata without downloading
@@ -394,8 +2313,8 @@ def get_video_info(url):
         'quiet': True,
         'no_warnings': True,
         'extract_flat': 'in_playlist',  # Only flatten if it's a playlist
-        'remote_components': ['ejs:github'],
     }
+    _apply_component_cache(ydl_opts_flat)
 
     try:
         with yt_dlp.YoutubeDL(ydl_opts_flat) as ydl:
@@ -413,6 +2332,7 @@ def get_video_info(url):
                         'title': entry.get('title'),
                         'duration': entry.get('duration'),
                         'uploader': entry.get('uploader'),
+                        'thumbnail': _entry_thumbnail(entry),
                     } for entry in info.get('entries', []) if entry]
                 })
 
@@ -511,8 +2431,8 @@ def download_video(url, output_path, format_id='best', task_id=None, callback=No
         'no_warnings': False,
         'progress_hooks': [progress_hook],
         'concurrent_fragment_downloads': 4,
-        'remote_components': ['ejs:github'],
     }
+    _apply_component_cache(ydl_opts)
 
     # If downloading audio only, prefer common audio containers
     if format_id == 'audio_only':
@@ -621,24 +2541,587 @@ def _get_audio_formats(info):
     return formats
 
 
-def _get_video_formats(info):
-    """Extract video format information"""
-    formats = []
-    for f in info.get('formats', []):
-        if f.get('vcodec') != 'none' or f.get('acodec') != 'none':
-            formats.append({
-                'format_id': f.get('format_id'),
-                'ext': f.get('ext'),
-                'quality': f.get('format_note', 'Unknown'),
-                'resolution': f.get('resolution', 'audio only'),
-                'filesize': f.get('filesize'),
-                'fps': f.get('fps'),
-                'vcodec': f.get('vcodec'),
-                'acodec': f.get('acodec'),
-            })
-    return formats
+def _get_video_formats(info):
+    """Extract video format information"""
+    formats = []
+    for f in info.get('formats', []):
+        if f.get('vcodec') != 'none' or f.get('acodec') != 'none':
+            formats.append({
+                'format_id': f.get('format_id'),
+                'ext': f.get('ext'),
+                'quality': f.get('format_note', 'Unknown'),
+                'resolution': f.get('resolution', 'audio only'),
+                'filesize': f.get('filesize'),
+                'fps': f.get('fps'),
+                'vcodec': f.get('vcodec'),
+                'acodec': f.get('acodec'),
+            })
+    return formats
+
+
+# ============================================================================
+# DIRECT GALLERY FETCHER
+# ============================================================================
+
+# Direct image URLs resolved by get_media_info, keyed by page URL, so that a
+# following download_media call can skip extraction and format selection.
+_RESOLVED_MEDIA = {}
+_RESOLVED_MEDIA_TTL = 10 * 60
+_RESOLVED_MEDIA_MAX = 64
+_RESOLVED_MEDIA_LOCK = threading.Lock()
+
+_DIRECT_FETCH_WORKERS = 6
+_DIRECT_FETCH_CHUNK = 256 * 1024
+_DIRECT_FETCH_MAX_REDIRECTS = 5
+
+
+def _remember_direct_media(url, title, entries):
+    """Remember direct image URLs for a page if every entry has one."""
+    items = []
+    for entry in entries:
+        if not entry or not entry.get('url') or not _is_image_format(entry):
+            return
+        items.append({
+            'id': entry.get('id'),
+            'url': entry['url'],
+            'title': entry.get('title'),
+            'ext': entry.get('ext') or 'jpg',
+            'http_headers': entry.get('http_headers') or {},
+        })
+    if not items:
+        return
+
+    with _RESOLVED_MEDIA_LOCK:
+        _RESOLVED_MEDIA[url] = (time.time(), title, items)
+        if len(_RESOLVED_MEDIA) > _RESOLVED_MEDIA_MAX:
+            oldest = min(_RESOLVED_MEDIA, key=lambda k: _RESOLVED_MEDIA[k][0])
+            del _RESOLVED_MEDIA[oldest]
+
+
+def _lookup_direct_media(url):
+    """Return (title, items) resolved for a page URL, or None if stale/unknown."""
+    with _RESOLVED_MEDIA_LOCK:
+        cached = _RESOLVED_MEDIA.get(url)
+        if not cached:
+            return None
+        if time.time() - cached[0] > _RESOLVED_MEDIA_TTL:
+            del _RESOLVED_MEDIA[url]
+            return None
+        return cached[1], cached[2]
+
+
+class _ConnectionPool:
+    """Keep-alive HTTP(S) connections shared by the fetch workers, per host."""
+
+    def __init__(self, timeout=30):
+        self._timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def get(self, scheme, netloc):
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        conn_cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return conn_cls(netloc, timeout=self._timeout)
+
+    def put(self, scheme, netloc, conn):
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(conn)
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+def _content_range_total(value):
+    """Complete length from a Content-Range header ("bytes */1234"), or None."""
+    match = re.match(r'bytes\s+(?:\d+-\d+|\*)/(\d+)', value or '')
+    return int(match.group(1)) if match else None
+
+
+def _fetch_direct_file(pool, url, filename, headers, task_id=None, on_bytes=None, hashes=None,
+                       reservation=None, cookiejar=None):
+    """
+    Fetch one URL into filename over a pooled connection.
+
+    Partial data is kept in a .part file and resumed with a Range request.
+    The final size is checked against Content-Length before the rename.
+    Cookies come from cookiejar for each hop's URL; Cookie and Authorization
+    headers passed by the caller are dropped once a redirect leaves the
+    original scheme and host.
+
+    Returns:
+        int: Number of bytes in the finished file
+    """
+    part = filename + '.part'
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = dict(headers)
+    origin = urllib.parse.urlsplit(url)[:2]
+
+    for _ in range(_DIRECT_FETCH_MAX_REDIRECTS + 1):
+        parsed = urllib.parse.urlsplit(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+
+        if parsed[:2] != origin:
+            headers = {k: v for k, v in headers.items()
+                       if k.lower() not in ('cookie', 'authorization')}
+        req_headers = dict(headers)
+        cookie = cookiejar.get_cookie_header(url) if cookiejar is not None else None
+        if cookie:
+            req_headers['Cookie'] = cookie
+        if offset:
+            req_headers['Range'] = f'bytes={offset}-'
+
+        conn = pool.get(parsed.scheme, parsed.netloc)
+        # Only a connection whose response was read to the end goes back to
+        # the pool; any error closes it
+        reusable = False
+        try:
+            try:
+                conn.request('GET', path, headers=req_headers)
+                resp = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                # Stale keep-alive connection: retry once on a fresh one
+                conn.close()
+                conn = pool.get(parsed.scheme, parsed.netloc)
+                conn.request('GET', path, headers=req_headers)
+                resp = conn.getresponse()
+
+            if resp.status in (301, 302, 303, 307, 308):
+                location = resp.getheader('Location')
+                resp.read()
+                reusable = True
+                if not location:
+                    raise OSError(f'HTTP Error {resp.status}: redirect without location')
+                url = urllib.parse.urljoin(url, location)
+                continue
+
+            if resp.status == 416 and offset:
+                resp.read()
+                reusable = True
+                if _content_range_total(resp.getheader('Content-Range')) == offset:
+                    # Range not satisfiable: the .part file already holds everything
+                    os.replace(part, filename)
+                    return offset
+                # The .part file does not match the remote file: start over
+                os.remove(part)
+                offset = 0
+                continue
+
+            if resp.status not in (200, 206):
+                resp.read()
+                raise OSError(f'HTTP Error {resp.status}: {resp.reason}')
+
+            if resp.status == 200:
+                offset = 0  # Server ignored the Range header
+            length = resp.getheader('Content-Length')
+            expected = offset + int(length) if length and length.isdigit() else None
+
+            if reservation is not None and expected:
+                reservation.admit(filename, expected - offset)
+
+            written = offset
+            mode = 'ab' if offset else 'wb'
+            with open(part, mode) as raw:
+                if expected and _WRITE_PATH['preallocate']:
+                    _preallocate(raw.fileno(), expected)
+                f = hashes.wrap(raw, part, mode) if hashes is not None else raw
+                while True:
+                    if task_id and _is_cancelled(task_id):
+                        raise DownloadCancelled()
+                    chunk = resp.read(_DIRECT_FETCH_CHUNK)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    written += len(chunk)
+                    if reservation is not None:
+                        reservation.progress(filename, written - offset)
+                    if on_bytes:
+                        on_bytes(len(chunk))
+
+            if expected is not None and written != expected:
+                raise OSError(f'Incomplete download: got {written} of {expected} bytes')
+
+            reusable = True
+        finally:
+            if reusable:
+                pool.put(parsed.scheme, parsed.netloc, conn)
+            else:
+                conn.close()
+
+        os.replace(part, filename)
+        if hashes is not None:
+            hashes.finish(filename, part)
+        if reservation is not None:
+            reservation.settle(filename)
+        return written
+
+    raise OSError('Too many redirects')
+
+
+def _download_direct_images(items, title, outtmpl, ydl_opts,
+                            cookies_file=None, indices=None, task_id=None,
+                            callback=None, hashes=None, reservation=None):
+    """
+    Download already-resolved image URLs concurrently.
+
+    File names come from yt-dlp's prepare_filename with the usual output
+    template, so the layout matches the regular download path exactly.
+
+    Returns:
+        list: Final file names, in item order
+    """
+    positions = sorted(indices) if indices else list(range(len(items)))
+    positions = [i for i in positions if 0 <= i < len(items)]
+    is_gallery = len(items) > 1 or indices is not None
+    item_count = len(positions)
+
+    pool = _ConnectionPool(timeout=ydl_opts.get('socket_timeout') or 30)
+    progress_lock = threading.Lock()
+    progress = {'done': 0, 'bytes': 0}
+
+    def report(item_index=None):
+        if not (callback and task_id):
+            return
+        with progress_lock:
+            done = progress['done']
+            downloaded = progress['bytes']
+        try:
+            callback.onProgress(
+                task_id,
+                _safe_float(done / item_count) if item_count else None,
+                None,
+                None,
+                _safe_int(downloaded),
+                None,
+                _safe_int(item_index),
+                _safe_int(item_count),
+            )
+        except Exception as e:
+            print(f"Error in callback: {e}")
+
+    def on_bytes(n):
+        with progress_lock:
+            progress['bytes'] += n
+
+    with _create_ydl({**ydl_opts, 'outtmpl': outtmpl}, cookies_file) as ydl:
+        jobs = []
+        for pos in positions:
+            item = items[pos]
+            info = {
+                'id': item.get('id') or str(pos + 1),
+                'title': item.get('title') or title or 'Untitled',
+                'ext': item.get('ext') or 'jpg',
+            }
+            if is_gallery:
+                info.update({
+                    'playlist_index': pos + 1,
+                    'playlist_count': len(items),
+                    '__last_playlist_index': positions[-1] + 1,
+                })
+            filename = ydl.prepare_filename(info)
+            headers = {
+                'User-Agent': ydl_opts.get('user_agent') or _get_random_user_agent(),
+                'Accept': '*/*',
+                'Connection': 'keep-alive',
+                **item.get('http_headers', {}),
+            }
+            jobs.append((pos, item['url'], filename, headers))
+        cookiejar = ydl.cookiejar
+
+    for _, _, filename, _ in jobs:
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+
+    filenames = {}
+    try:
+        with ThreadPoolExecutor(max_workers=min(_DIRECT_FETCH_WORKERS, len(jobs) or 1)) as executor:
+            futures = {
+                executor.submit(_fetch_direct_file, pool, item_url, filename, headers,
+                                task_id, on_bytes, hashes, reservation, cookiejar): (pos, filename)
+                for pos, item_url, filename, headers in jobs
+            }
+            for future in as_completed(futures):
+                pos, filename = futures[future]
+                future.result()
+                filenames[pos] = filename
+                with progress_lock:
+                    progress['done'] += 1
+                report(pos + 1)
+    finally:
+        pool.close()
+
+    return [filenames[pos] for pos, _, _, _ in jobs]
+
+
+# ============================================================================
+# THUMBNAIL CACHE
+# ============================================================================
+
+# Thumbnails are stored content-addressed (blobs/<sha256>.<ext>) with a small
+# ref file per (url, width) pointing at the blob, so identical images served
+# under different URLs share one file. Blob mtimes are bumped on every hit and
+# the oldest blobs are evicted, together with the refs pointing at them, once
+# the cache (blobs and refs) grows past its size limit.
+_THUMBNAIL_STATE = {
+    'cache_dir': os.path.join(tempfile.gettempdir(), 'ytdlp_thumbnails'),
+    'max_bytes': 100 * 1024 * 1024,
+}
+_THUMBNAIL_LOCK = threading.Lock()
+_THUMBNAIL_WORKERS = 8
+
+
+def _entry_thumbnail(entry):
+    """Pick a thumbnail URL for an entry, falling back to the thumbnails list."""
+    if entry.get('thumbnail'):
+        return entry['thumbnail']
+    thumbnails = [t for t in entry.get('thumbnails') or [] if t.get('url')]
+    return thumbnails[-1]['url'] if thumbnails else None
+
+
+def _collect_thumbnail_urls(result):
+    """Collect thumbnail URLs from a get_media_info/get_video_info result."""
+    urls = []
+    if result.get('thumbnail'):
+        urls.append(result['thumbnail'])
+    for entry in (result.get('items') or []) + (result.get('entries') or []):
+        if entry and entry.get('thumbnail'):
+            urls.append(entry['thumbnail'])
+    return list(dict.fromkeys(urls))
+
+
+def _downscale_image(data, target_width):
+    """Downscale image bytes to target_width, or return None if not possible."""
+    if Image is None or not target_width:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width <= target_width:
+                return None
+            height = max(1, round(img.height * target_width / img.width))
+            img = img.convert('RGB').resize((target_width, height), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, format='JPEG', quality=85)
+            return out.getvalue()
+    except Exception as e:
+        print(f"Thumbnail downscale failed: {e}")
+        return None
+
+
+def _thumbnail_ref_path(cache_dir, url, target_width):
+    key = hashlib.sha256(f'{url}|{target_width or 0}'.encode()).hexdigest()
+    return os.path.join(cache_dir, 'refs', key)
+
+
+def _cached_thumbnail(cache_dir, url, target_width):
+    """Return the cached blob path for a URL and mark it recently used."""
+    try:
+        with open(_thumbnail_ref_path(cache_dir, url, target_width), encoding='utf-8') as f:
+            blob = os.path.join(cache_dir, 'blobs', f.read().strip())
+        os.utime(blob)
+        return blob
+    except OSError:
+        return None
+
+
+def _store_thumbnail(cache_dir, url, target_width, data, ext):
+    """Write thumbnail bytes as a content-addressed blob and point the ref at it."""
+    scaled = _downscale_image(data, target_width)
+    if scaled is not None:
+        data, ext = scaled, 'jpg'
+
+    name = f'{hashlib.sha256(data).hexdigest()}.{ext}'
+    blob = os.path.join(cache_dir, 'blobs', name)
+    if os.path.exists(blob):
+        os.utime(blob)
+    else:
+        def write_blob(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        _write_file_atomic(blob, write_blob)
+
+    def write_ref(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(name)
+    _write_file_atomic(_thumbnail_ref_path(cache_dir, url, target_width), write_ref)
+    return blob
+
+
+def _evict_thumbnails(cache_dir, max_bytes, keep=()):
+    """Delete least recently used blobs, with their refs, until the cache fits in max_bytes.
+
+    Ref files count towards the limit too. Refs whose blob is gone are
+    always removed. Blobs listed in keep (the paths just handed back to the
+    caller) are never evicted, even if that leaves the cache over its limit.
+    """
+    blob_dir = os.path.join(cache_dir, 'blobs')
+    ref_dir = os.path.join(cache_dir, 'refs')
+    blobs = {}  # path -> [mtime, size, [(ref path, ref size)]]
+    try:
+        for e in os.scandir(blob_dir):
+            try:
+                st = e.stat()
+            except OSError:
+                continue  # Removed concurrently
+            if e.is_file():
+                blobs[e.path] = [st.st_mtime, st.st_size, []]
+        refs = list(os.scandir(ref_dir))
+    except OSError:
+        return 0
+
+    orphans = []
+    for e in refs:
+        try:
+            size = e.stat().st_size
+            with open(e.path, encoding='utf-8') as f:
+                target = os.path.join(blob_dir, f.read().strip())
+        except OSError:
+            continue
+        if target in blobs:
+            blobs[target][2].append((e.path, size))
+        else:
+            orphans.append(e.path)
+
+    def remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    for path in orphans:
+        remove(path)
+
+    total = sum(size + sum(r for _, r in ref_list) for _, size, ref_list in blobs.values())
+    evicted = 0
+    for path, (_, size, ref_list) in sorted(blobs.items(), key=lambda item: item[1][0]):
+        if total <= max_bytes:
+            break
+        if path in keep or not remove(path):
+            continue
+        for ref_path, ref_size in ref_list:
+            remove(ref_path)
+            total -= ref_size
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def configure_thumbnail_cache(cache_dir=None, max_bytes=None):
+    """
+    Configure the on-disk thumbnail cache.
+
+    Args:
+        cache_dir (str): Directory for cached thumbnails
+        max_bytes (int): Size limit before least recently used files are evicted
+
+    Returns:
+        str: JSON with the active configuration
+    """
+    with _THUMBNAIL_LOCK:
+        if cache_dir:
+            _THUMBNAIL_STATE['cache_dir'] = cache_dir
+        if max_bytes:
+            _THUMBNAIL_STATE['max_bytes'] = int(max_bytes)
+        state = dict(_THUMBNAIL_STATE)
+    return json.dumps({'success': True, **state})
+
+
+def prefetch_thumbnails(media_info, target_width=None, cookies_file=None):
+    """
+    Download thumbnails for a media info result into the local cache.
+
+    Args:
+        media_info (str|dict|list): JSON result of get_media_info/get_video_info,
+            or a list of thumbnail URLs
+        target_width (int): Optional width to downscale to (requires Pillow)
+        cookies_file (str): Path to cookies file for authenticated access
+
+    Returns:
+        str: JSON with a 'thumbnails' map of URL -> local path
+    """
+    try:
+        if isinstance(media_info, str):
+            media_info = json.loads(media_info)
+        if isinstance(media_info, dict):
+            urls = _collect_thumbnail_urls(media_info)
+        else:
+            urls = list(dict.fromkeys(u for u in media_info if u))
+        target_width = _safe_int(target_width)
+
+        with _THUMBNAIL_LOCK:
+            cache_dir = _THUMBNAIL_STATE['cache_dir']
+            max_bytes = _THUMBNAIL_STATE['max_bytes']
+        os.makedirs(os.path.join(cache_dir, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'refs'), exist_ok=True)
+
+        thumbnails = {}
+        missing = []
+        for url in urls:
+            path = _cached_thumbnail(cache_dir, url, target_width)
+            if path:
+                thumbnails[url] = path
+            else:
+                missing.append(url)
+
+        errors = {}
+        if missing:
+            pool = _ConnectionPool(timeout=15)
+            user_agent = _get_random_user_agent()
+
+            def fetch(url):
+                headers = {'User-Agent': user_agent, 'Accept': 'image/*,*/*'}
+                # Cookies are picked per redirect hop by the fetcher
+                jar = _cookie_jar_from_cache(cookies_file)
+                ext = os.path.splitext(urllib.parse.urlsplit(url).path)[1].lstrip('.').lower()
+                if ext not in ('jpg', 'jpeg', 'png', 'webp', 'gif'):
+                    ext = 'jpg'
+                fd, tmp_path = tempfile.mkstemp(prefix='.thumb-', dir=cache_dir)
+                os.close(fd)
+                try:
+                    _fetch_direct_file(pool, url, tmp_path, headers, cookiejar=jar)
+                    with open(tmp_path, 'rb') as f:
+                        data = f.read()
+                finally:
+                    for leftover in (tmp_path, tmp_path + '.part'):
+                        if os.path.exists(leftover):
+                            os.remove(leftover)
+                return _store_thumbnail(cache_dir, url, target_width, data, ext)
+
+            try:
+                with ThreadPoolExecutor(max_workers=min(_THUMBNAIL_WORKERS, len(missing))) as executor:
+                    futures = {executor.submit(fetch, url): url for url in missing}
+                    for future in as_completed(futures):
+                        url = futures[future]
+                        try:
+                            thumbnails[url] = future.result()
+                        except Exception as e:
+                            errors[url] = str(e)
+            finally:
+                pool.close()
+            _evict_thumbnails(cache_dir, max_bytes, keep=set(thumbnails.values()))
+
+        return json.dumps({
+            'success': True,
+            'thumbnails': thumbnails,
+            'cached': len(urls) - len(missing),
+            'fetched': len(missing) - len(errors),
+            'errors': errors,
+        })
+    except Exception as e:
+        return json.dumps({
+            'success': False,
+            'error': str(e)
+        })
 
 
+@_profiled
 def get_media_info(url, cookies_file=None):
     """
     Extract comprehensive media metadata including images, videos, audio, galleries
@@ -646,11 +3129,16 @@ def get_media_info(url, cookies_file=None):
     Args:
         url (str): Media URL to extract information from
         cookies_file (str): Path to cookies file for authenticated access
+        profile (bool): Capture a CPU/memory profile of this call; None
+            samples at the configured rate (see configure_profiling)
 
     Returns:
         str: JSON with media_type, items, and metadata
     """
-    ydl_opts = _get_base_ydl_opts(cookies_file=cookies_file, enable_anti_ban=True)
+    if _use_process_pool():
+        return _PROCESS_POOL.call('get_media_info', {'url': url, 'cookies_file': cookies_file})
+
+    ydl_opts = _get_base_ydl_opts(enable_anti_ban=True)
     ydl_opts.update({
         'quiet': True,
         'no_warnings': True,
@@ -659,7 +3147,7 @@ def get_media_info(url, cookies_file=None):
     })
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with _create_ydl(ydl_opts, cookies_file) as ydl:
             info = ydl.extract_info(url, download=False)
 
             # Check for live content
@@ -700,6 +3188,8 @@ def get_media_info(url, cookies_file=None):
                         'media_type': 'image' if _is_image_format(entry) else 'video'
                     })
 
+                _remember_direct_media(url, info.get('title'), info.get('entries', []))
+
                 return json.dumps({
                     'success': True,
                     'media_type': 'gallery',
@@ -712,6 +3202,7 @@ def get_media_info(url, cookies_file=None):
 
             elif media_type == 'image':
                 # Single image
+                _remember_direct_media(url, info.get('title'), [info])
                 return json.dumps({
                     'success': True,
                     'media_type': 'image',
@@ -751,6 +3242,7 @@ def get_media_info(url, cookies_file=None):
                         'title': entry.get('title'),
                         'duration': entry.get('duration'),
                         'uploader': entry.get('uploader'),
+                        'thumbnail': _entry_thumbnail(entry),
                     } for entry in info.get('entries', []) if entry]
                 })
 
@@ -798,13 +3290,16 @@ def get_media_info(url, cookies_file=None):
         })
 
 
+@_profiled(after_admission=True)
 def download_media(url, output_path, format_id='best', media_type='auto',
                    task_id=None, callback=None, cookies_file=None,
                    download_all_gallery=True, selected_indices=None,
                    ffmpeg_path=None, max_quality=None,
                    sleep_interval=None, concurrent_fragments=None,
                    custom_user_agent=None, proxy_url=None,
-                   embed_subtitles=False, subtitle_language=None):
+                   embed_subtitles=False, subtitle_language=None,
+                   adaptive_throttle=True, hash_algorithm=None,
+                   skip_archived=True, priority='normal'):
     """
     Universal media downloader with enhanced error handling and anti-ban measures
 
@@ -820,12 +3315,70 @@ def download_media(url, output_path, format_id='best', media_type='auto',
         selected_indices (list): List of indices to download from gallery
         ffmpeg_path (str): Optional path to FFmpeg binary
         max_quality (int): Optional max video height (e.g., 720, 1080)
+        adaptive_throttle (bool): Reconnect when throughput collapses relative
+            to the learned baseline instead of using a fixed rate limit
+        hash_algorithm (str): hashlib algorithm (e.g. 'sha256') for an
+            integrity report computed while the file is written; None (the
+            default) skips hashing
+        skip_archived (bool): Skip items already recorded in the download
+            archive for the same format selection whose file still exists
+            (they are recorded either way)
+        priority (str): 'interactive', 'normal' or 'background'; see
+            configure_scheduler
+        profile (bool): Capture a CPU/memory profile of this call; None
+            samples at the configured rate (see configure_profiling)
 
     Returns:
         str: JSON with download result
     """
+    kwargs = dict(locals())
+    if priority not in _PRIORITY_CLASSES:
+        return json.dumps({'success': False, 'error': f'Unknown priority: {priority}'})
+
+    ticket = _take_preadmitted(task_id)
+    if ticket is None and _SCHEDULER_STATE['enabled']:
+        ticket = _admit_task(priority, task_id)
+        if ticket is None:
+            return json.dumps({
+                'success': False,
+                'error': 'Download cancelled',
+                'error_code': 'CANCELLED',
+                'cancelled': True,
+            })
+
+    try:
+        if _use_process_pool():
+            kwargs.pop('callback')
+            return _PROCESS_POOL.call('download_media', kwargs, callback=callback, task_id=task_id)
+        kwargs.pop('priority')
+        return _run_admitted_profiled('download_media', _download_media, {**kwargs, 'ticket': ticket})
+    finally:
+        if ticket:
+            ticket.release()
+
+
+def _download_media(url, output_path, format_id, media_type, task_id, callback,
+                    cookies_file, download_all_gallery, selected_indices,
+                    ffmpeg_path, max_quality, sleep_interval, concurrent_fragments,
+                    custom_user_agent, proxy_url, embed_subtitles, subtitle_language,
+                    adaptive_throttle, hash_algorithm, skip_archived, ticket=None):
+    """download_media body, run once the task has been admitted."""
+    monitor = _ThroughputMonitor(task_id) if adaptive_throttle else None
+    preallocator = _Preallocator()
+    hashes = _StreamHashes(hash_algorithm) if hash_algorithm else None
+    reservation = _StorageReservation(output_path, task_id) if _STORAGE_ADMISSION['policy'] != 'off' else None
+
     def progress_hook(d):
         status = d.get('status')
+        preallocator.observe(d)
+        if hashes:
+            hashes.observe(d)
+        if monitor:
+            monitor.observe(d)
+        if ticket:
+            ticket.checkpoint(d)
+        if reservation and status == 'downloading' and d.get('downloaded_bytes'):
+            reservation.progress('ytdl', d['downloaded_bytes'], d.get('filename'))
         if status in ('downloading', 'finished'):
             if callback and task_id:
                 if _is_cancelled(task_id):
@@ -849,14 +3402,16 @@ def download_media(url, output_path, format_id='best', media_type='auto',
 
     # Get base options with anti-ban measures
     ydl_opts = _get_base_ydl_opts(
-        cookies_file=cookies_file,
         enable_anti_ban=True,
+        adaptive_throttle=adaptive_throttle,
         sleep_interval=sleep_interval,
         concurrent_fragments=concurrent_fragments,
         user_agent=custom_user_agent,
         proxy_url=proxy_url,
     )
     ydl_opts['progress_hooks'] = [progress_hook]
+    if hashes:
+        ydl_opts[_STREAM_HASHES_PARAM] = hashes
 
     # FFmpeg configuration
     if ffmpeg_path and os.path.exists(ffmpeg_path):
@@ -909,11 +3464,97 @@ def download_media(url, output_path, format_id='best', media_type='auto',
             # Specific format ID with fallbacks
             ydl_opts['format'] = f'{format_id}/best[height<=720]/best'
 
-        ydl_opts['outtmpl'] = os.path.join(output_path, '%(title)s_%(epoch)s.%(ext)s')
+        # The epoch is fixed once per call rather than taken from the info
+        # dict: a re-extraction after a reconnect gets a new info dict, and
+        # must land on the same .part file to resume.
+        ydl_opts['outtmpl'] = os.path.join(output_path, f'%(title)s_{int(time.time())}.%(ext)s')
+
+    # Fast path: fetch image URLs resolved by get_media_info directly,
+    # bypassing yt-dlp's per-item format selection and downloader.
+    resolved = _lookup_direct_media(url) if media_type in ('image', 'gallery') and not proxy_url else None
+    if resolved and (media_type == 'gallery' or len(resolved[1]) == 1):
+        title, items = resolved
+        try:
+            filenames = _download_direct_images(
+                items, title, ydl_opts['outtmpl'], ydl_opts,
+                cookies_file=cookies_file,
+                indices=selected_indices if media_type == 'gallery' else None,
+                task_id=task_id, callback=callback, hashes=hashes,
+                reservation=reservation,
+            )
+            integrity = hashes.report(filenames) if hashes else None
+            if media_type == 'gallery':
+                return json.dumps({
+                    'success': True,
+                    'filenames': filenames,
+                    'title': title,
+                    'count': len(filenames),
+                    'integrity': integrity,
+                })
+            return json.dumps({
+                'success': True,
+                'filename': filenames[0],
+                'title': title,
+                'integrity': integrity,
+            })
+        except _StorageRejected as e:
+            return json.dumps({
+                'success': False,
+                'error': 'Not enough storage space',
+                'error_code': 'STORAGE_FULL',
+                'suggestion': 'Free up some storage space and try again',
+                'required_bytes': e.needed,
+                'available_bytes': e.available,
+            })
+        except DownloadCancelled:
+            _clear_cancelled(task_id)
+            return json.dumps({
+                'success': False,
+                'error': 'Download cancelled',
+                'error_code': 'CANCELLED',
+                'cancelled': True,
+            })
+        except Exception as e:
+            # URLs may have expired; fall back to a full yt-dlp download
+            print(f"Direct image fetch failed, falling back to yt-dlp: {e}")
+        finally:
+            if reservation:
+                reservation.release()
+
+    archive = None
+    if _ARCHIVE_STATE['enabled']:
+        archive = _ArchiveView(_get_archive_index(), ydl_opts['format'], skip=skip_archived)
+        ydl_opts['download_archive'] = archive
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with _create_ydl(ydl_opts, cookies_file) as ydl:
+            if reservation:
+                ydl.add_post_processor(_AdmissionPP(ydl, reservation), when='before_dl')
+            if archive is not None:
+                ydl.add_post_processor(_ArchiveOutputPP(ydl, archive), when='after_move')
             info = ydl.extract_info(url, download=True)
+            skipped = archive.skipped if archive else []
+
+            # Already in the archive: yt-dlp stopped before (or right after)
+            # extraction and nothing was downloaded
+            if info is None and skipped:
+                return json.dumps({
+                    'success': True,
+                    'already_downloaded': True,
+                    'filename': skipped[0]['filename'] if len(skipped) == 1 else None,
+                    'title': None,
+                    'skipped': skipped,
+                })
+            if archive and 'entries' not in info:
+                archive_id = ydl._make_archive_id(info) or ''
+                if archive.was_skipped(archive_id):
+                    return json.dumps({
+                        'success': True,
+                        'already_downloaded': True,
+                        'filename': archive.skipped_filename(archive_id),
+                        'title': info.get('title'),
+                        'skipped': skipped,
+                    })
 
             # Check for live content before attempting download
             if _is_live_content(info):
@@ -935,7 +3576,10 @@ def download_media(url, output_path, format_id='best', media_type='auto',
                     'success': True,
                     'filenames': files,
                     'title': info.get('title'),
-                    'count': len(files)
+                    'count': len(files),
+                    'reconnects': monitor.reconnects if monitor else 0,
+                    'integrity': hashes.report(files) if hashes else None,
+                    'skipped': skipped,
                 })
             else:
                 # Single file
@@ -943,9 +3587,21 @@ def download_media(url, output_path, format_id='best', media_type='auto',
                 return json.dumps({
                     'success': True,
                     'filename': filename,
-                    'title': info.get('title')
+                    'title': info.get('title'),
+                    'reconnects': monitor.reconnects if monitor else 0,
+                    'integrity': hashes.report([filename]) if hashes else None,
+                    'skipped': skipped,
                 })
 
+    except _StorageRejected as e:
+        return json.dumps({
+            'success': False,
+            'error': 'Not enough storage space',
+            'error_code': 'STORAGE_FULL',
+            'suggestion': 'Free up some storage space and try again',
+            'required_bytes': e.needed,
+            'available_bytes': e.available,
+        })
     except DownloadCancelled:
         return json.dumps({
             'success': False,
@@ -979,29 +3635,63 @@ def download_media(url, output_path, format_id='best', media_type='auto',
             'success': False,
             **error_info
         })
+    finally:
+        if reservation:
+            reservation.release()
 
 
-def extract_cookies_from_browser(browser='chrome'):
+def extract_cookies_from_browser(browser='chrome', profile=None, output_dir=None,
+                                 force_refresh=False):
     """
     Extract cookies from browser for authenticated access
 
+    Each browser/profile pair gets its own cookie file, written atomically so
+    concurrent tasks never read a half-written file. A recent export is reused
+    for a few minutes instead of decrypting the browser store again.
+
     Args:
         browser (str): Browser name ('chrome', 'firefox', 'edge')
+        profile (str): Optional browser profile name or path
+        output_dir (str): Directory for the cookie file (defaults to temp dir)
+        force_refresh (bool): Re-extract even if a recent export exists
 
     Returns:
         str: JSON with cookie file path or error
     """
     try:
-        cookie_file = os.path.join(tempfile.gettempdir(), 'ytdlp_cookies.txt')
+        key = (browser, profile)
+        with _COOKIE_CACHE_LOCK:
+            cached = _BROWSER_COOKIE_EXPORTS.get(key)
+        if (cached and not force_refresh
+                and time.time() - cached[0] < _BROWSER_COOKIE_TTL
+                and os.path.exists(cached[1])):
+            return json.dumps({
+                'success': True,
+                'cookie_file': cached[1],
+                'cached': True,
+            })
+
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', f'{browser}_{profile}' if profile else browser)
+        cookie_dir = output_dir or tempfile.gettempdir()
+        os.makedirs(cookie_dir, exist_ok=True)
+        cookie_file = os.path.join(cookie_dir, f'ytdlp_cookies_{name}.txt')
 
         ydl_opts = {
-            'cookiesfrombrowser': (browser,),
+            'cookiesfrombrowser': (browser, profile) if profile else (browser,),
         }
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             # Extract and save cookies
-            if hasattr(ydl, 'cookiejar') and ydl.cookiejar:
-                ydl.cookiejar.save(cookie_file, ignore_discard=True, ignore_expires=True)
+            jar = ydl.cookiejar
+            _write_file_atomic(
+                cookie_file,
+                lambda tmp: jar.save(tmp, ignore_discard=True, ignore_expires=True),
+            )
+
+        # Warm the parse cache so the next download does not re-read the file
+        _load_cached_cookies(cookie_file)
+        with _COOKIE_CACHE_LOCK:
+            _BROWSER_COOKIE_EXPORTS[key] = (time.time(), cookie_file)
 
         return json.dumps({
             'success': True,
@@ -1014,3 +3704,1059 @@ def extract_cookies_from_browser(browser='chrome'):
             'error': str(e),
             'suggestion': f'Make sure {browser} is installed and you are logged into the target site'
         })
+
+
+# ============================================================================
+# PLAYLIST SYNC
+# ============================================================================
+
+# A sync state blob remembers the ids of the most recent entries seen for a
+# source (the watermark). Enumeration is lazy, so a poll stops paging as soon
+# as it meets a watermark id, and an unchanged channel costs one page fetch.
+# Several ids are kept so a deleted upload does not lose the position.
+# When more than max_new entries arrived, the sync handles the newest ones
+# and leaves a 'behind' segment: the entries after its 'resume' ids (the
+# oldest ones handled) and before its 'watermark' ids (the previous
+# position) are still owed, and later syncs work through them.
+# Lists that grow at the end (order='oldest_first') resume from the stored
+# entry count instead, checking that the entry just before it is still known.
+_SYNC_STATE_VERSION = 1
+_SYNC_WATERMARK_SIZE = 25
+_SYNC_MAX_ATTEMPTS = 3
+
+
+def _load_sync_state(url, state):
+    """Parse a state blob (dict or JSON string); unusable blobs start fresh."""
+    if isinstance(state, str):
+        try:
+            state = json.loads(state) if state.strip() else None
+        except ValueError:
+            state = None
+    if (not isinstance(state, dict) or state.get('version') != _SYNC_STATE_VERSION
+            or state.get('source') != url):
+        return None
+    return state
+
+
+def _open_playlist(ydl, url):
+    """Extract a playlist without processing it, so entries stay lazy."""
+    info = ydl.extract_info(url, download=False, process=False)
+    for _ in range(5):
+        if not info or info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = ydl.extract_info(info['url'], ie_key=info.get('ie_key'),
+                                download=False, process=False)
+    if not info or info.get('_type') != 'playlist':
+        return info, None
+    # Not `or []`: truth-testing a PagedList fetches its first page
+    entries = info.get('entries')
+    return info, [] if entries is None else entries
+
+
+def _slice_entries(entries, start):
+    """Entries from start onwards, only fetching the pages that are needed."""
+    if hasattr(entries, 'getslice'):
+        return entries.getslice(start)
+    return itertools.islice(entries, start, None)
+
+
+def _scan_newest_first(entries, watermark, behind, limit):
+    """
+    Collect the unsynced entries of a newest-first listing.
+
+    Returns:
+        tuple: (entries above the watermark, entries from behind segments,
+            entries scanned, whether the watermark was met, updated segments)
+    """
+    entries = iter(entries)
+    head, gaps, scanned, found = [], [], 0, False
+    for entry in entries:
+        if not entry:
+            continue
+        scanned += 1
+        if entry.get('id') in watermark:
+            found = True
+            break
+        head.append(entry)
+        if len(head) >= limit:
+            break
+
+    segments = [dict(segment) for segment in behind]
+    if not found:
+        if head and watermark and len(head) >= limit:
+            # Out of budget before the watermark: everything between the
+            # oldest entry handled and the old position is still owed
+            segments.insert(0, {
+                'watermark': list(watermark),
+                'resume': [e.get('id') for e in head[-_SYNC_WATERMARK_SIZE:] if e.get('id')],
+            })
+        return head, gaps, scanned, found, segments
+
+    remaining = []
+    for index, segment in enumerate(segments):
+        stop, resume = set(segment['watermark']), set(segment['resume'])
+        resumed = exhausted = True
+        seen_resume = False
+        collected = []
+        for entry in entries:
+            if not entry:
+                continue
+            scanned += 1
+            entry_id = entry.get('id')
+            if entry_id in stop:
+                exhausted = False
+                break
+            if entry_id in resume:
+                seen_resume = True
+                continue
+            if not seen_resume:
+                continue  # Handled by the sync that left this segment
+            collected.append(entry)
+            if len(head) + len(gaps) + len(collected) >= limit:
+                resumed = False
+                break
+        gaps.extend(collected)
+        if not resumed:
+            segment['resume'] = [e.get('id') for e in collected[-_SYNC_WATERMARK_SIZE:] if e.get('id')]
+            remaining.append(segment)
+            remaining.extend(segments[index + 1:])
+            break
+        if exhausted:
+            break  # The listing ended; older segments cannot be reached
+    return head, gaps, scanned, found, remaining
+
+
+def _sync_entry(entry):
+    url = entry.get('url') or entry.get('webpage_url')
+    if url and not re.match(r'^[a-z][a-z0-9+.-]*://', url) and entry.get('ie_key'):
+        # Bare ids from flat extraction are resolved by the named extractor
+        url = f"{entry['ie_key'].lower()}:{url}"
+    return {'id': entry.get('id'), 'url': url, 'title': entry.get('title')}
+
+
+def sync_playlist(url, state, output_path, task_id=None, callback=None,
+                  cookies_file=None, order='newest_first', max_new=50,
+                  initial_backfill=0, **download_kwargs):
+    """
+    Download the entries added to a channel or playlist since the last sync
+
+    Args:
+        url (str): Channel or playlist URL
+        state (dict|str): State blob returned by the previous sync, or None
+        output_path (str): Directory path to save media
+        task_id (str): Unique task ID, shared by the item downloads so
+            cancel_download(task_id) stops the one running
+        callback (object): Callback for progress updates
+        cookies_file (str): Path to cookies file
+        order (str): 'newest_first' (channels, uploads) or 'oldest_first'
+            (playlists that grow at the end)
+        max_new (int): Most new entries handled in one sync
+        initial_backfill (int): New entries to download on the first sync;
+            the default only records the watermark
+        **download_kwargs: Passed to download_media for each entry
+
+    Returns:
+        str: JSON with downloaded/failed entries and the updated state
+    """
+    if order not in ('newest_first', 'oldest_first'):
+        return json.dumps({'success': False, 'error': f'Unknown order: {order}'})
+
+    previous = _load_sync_state(url, state)
+    watermark = list(previous['watermark']) if previous else []
+    known = set(watermark)
+    behind = list(previous.get('behind') or []) if previous else []
+
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+    }
+    if download_kwargs.get('proxy_url'):
+        ydl_opts['proxy'] = download_kwargs['proxy_url']
+    _apply_component_cache(ydl_opts)
+
+    new, scanned, found = [], 0, False
+    limit = max_new if previous else max(_SYNC_WATERMARK_SIZE, initial_backfill)
+    count = previous.get('count', 0) if previous else 0
+    try:
+        with _create_ydl(ydl_opts, cookies_file) as ydl:
+            info, entries = _open_playlist(ydl, url)
+            if entries is None:
+                return json.dumps({
+                    'success': False,
+                    'error': 'URL is not a channel or playlist',
+                    'error_code': 'NOT_A_PLAYLIST',
+                })
+
+            if order == 'newest_first':
+                head, gaps, scanned, found, behind = _scan_newest_first(
+                    entries, known, behind, limit)
+                new = head + gaps
+            else:
+                if not hasattr(entries, 'getslice') and not isinstance(entries, list):
+                    entries = LazyList(entries)  # Allows a rescan of a generator
+                # Resume one entry early and check it is the last one synced
+                tail = []
+                if previous and count:
+                    tail = list(itertools.islice(_slice_entries(entries, count - 1), limit + 1))
+                    scanned = len(tail)
+                if tail and tail[0] and tail[0].get('id') in known:
+                    found = True
+                    new = [e for e in tail[1:] if e]
+                    count += len(tail) - 1
+                else:
+                    # First sync, or the list changed before our position:
+                    # enumerate it all and take what follows the last known entry
+                    rescan = [e for e in _slice_entries(entries, 0) if e]
+                    scanned += len(rescan)
+                    last = max((i for i, e in enumerate(rescan) if e.get('id') in known), default=-1)
+                    found = last >= 0
+                    if previous:
+                        new = rescan[last + 1:last + 1 + limit]
+                        count = last + 1 + len(new)
+                    else:
+                        new = rescan[-limit:]
+                        count = len(rescan)
+    except Exception as e:
+        error_info = _parse_error_code(str(e))
+        return json.dumps({'success': False, **error_info})
+
+    items = [_sync_entry(e) for e in new]
+    if order == 'newest_first':
+        items.reverse()  # download oldest first
+    if not previous:
+        items = items[len(items) - initial_backfill:] if initial_backfill else []
+
+    # Retry earlier failures before the new items
+    queue_items = [dict(p) for p in (previous.get('pending') or [])] if previous else []
+    queue_items += [{**item, 'attempts': 0} for item in items if item['url']]
+
+    downloaded, failed, pending = [], [], []
+    cancelled = False
+    for item in queue_items:
+        if cancelled:
+            pending.append(item)
+            continue
+        result = json.loads(download_media(
+            item['url'], output_path, task_id=task_id,
+            callback=callback, cookies_file=cookies_file, **download_kwargs,
+        ))
+        record = {'id': item['id'], 'url': item['url'], 'title': item['title']}
+        if result.get('success'):
+            downloaded.append({**record, 'filename': result.get('filename'),
+                               'already_downloaded': bool(result.get('already_downloaded'))})
+            continue
+        failed.append({**record, 'error_code': result.get('error_code'), 'error': result.get('error')})
+        if result.get('cancelled') or (task_id and _is_cancelled(task_id)):
+            _clear_cancelled(task_id)
+            cancelled = True
+            pending.append(item)
+        elif item['attempts'] + 1 < _SYNC_MAX_ATTEMPTS:
+            pending.append({**item, 'attempts': item['attempts'] + 1})
+
+    new_ids = [e.get('id') for e in new if e.get('id')]
+    if order == 'newest_first':
+        # Entries from behind segments are older than the watermark
+        head_ids = [e.get('id') for e in head if e.get('id')]
+        watermark = list(dict.fromkeys(head_ids + watermark))[:_SYNC_WATERMARK_SIZE]
+    else:
+        watermark = list(dict.fromkeys(list(reversed(new_ids)) + watermark))[:_SYNC_WATERMARK_SIZE]
+
+    return json.dumps({
+        'success': True,
+        'title': info.get('title'),
+        'scanned': scanned,
+        'watermark_found': found,
+        'new': len(new) if previous else 0,
+        'behind': bool(behind),
+        'downloaded': downloaded,
+        'failed': failed,
+        'cancelled': cancelled,
+        'state': {
+            'version': _SYNC_STATE_VERSION,
+            'source': url,
+            'order': order,
+            'watermark': watermark,
+            'count': count,
+            'behind': behind,
+            'pending': pending,
+            'last_sync': int(time.time()),
+        },
+    })
+
+
+# ============================================================================
+# PROCESS POOL EXECUTION
+# ============================================================================
+
+# Optional mode for desktop hosts: bridge calls run in long-lived worker
+# processes instead of the embedded interpreter, so concurrent downloads are
+# not serialised on one GIL. Each worker imports yt_dlp once and runs up to
+# tasks_per_worker calls on its own threads. Progress, cancellation and
+# results travel over a pipe per worker. Storage reservations are tracked per
+# worker (see STORAGE ADMISSION), not across the pool. Not available on
+# Android, where Chaquopy cannot start subprocesses.
+_EXECUTION_MODE = {'mode': 'thread', 'workers': None, 'tasks_per_worker': 2}
+_PROCESS_POOL = None
+_PROCESS_POOL_LOCK = threading.Lock()
+_PROCESS_CALLS = ('download_media', 'get_media_info')
+
+
+class _ProgressProxy:
+    """Stand-in for the host callback inside a worker process."""
+
+    def __init__(self, send, call_id):
+        self._send = send
+        self._call_id = call_id
+
+    def onProgress(self, *args):
+        self._send(('progress', self._call_id, args))
+
+
+def _worker_settings():
+    """Snapshot of the configure_* settings a worker must share with this process."""
+    with _EJS_LOCK:
+        cache_dir = _EJS_STATE['cache_dir']
+    with _THUMBNAIL_LOCK:
+        thumbnails = dict(_THUMBNAIL_STATE)
+    return {
+        'component_cache_dir': cache_dir,
+        'write_path': dict(_WRITE_PATH),
+        'storage': dict(_STORAGE_ADMISSION),
+        'archive': dict(_ARCHIVE_STATE),
+        'thumbnails': thumbnails,
+        'profiling': dict(_PROFILING),
+    }
+
+
+def _apply_worker_settings(settings):
+    """Adopt the parent's settings inside a worker before running a call."""
+    cache_dir = settings.get('component_cache_dir')
+    with _EJS_LOCK:
+        current = _EJS_STATE['cache_dir']
+    if cache_dir and cache_dir != current:
+        configure_component_cache(cache_dir, refresh=False)
+    _WRITE_PATH.update(settings['write_path'])
+    _STORAGE_ADMISSION.update(settings['storage'])
+    _ARCHIVE_STATE.update(settings['archive'])
+    with _THUMBNAIL_LOCK:
+        _THUMBNAIL_STATE.update(settings['thumbnails'])
+    # Sampling is decided by the parent, which forwards the profile value
+    _PROFILING.update(settings['profiling'], sample_rate=0.0)
+
+
+def _worker_main(conn, tasks_per_worker):
+    """Entry point of a worker process: serve calls until the pipe closes."""
+    send_lock = threading.Lock()
+
+    def send(msg):
+        with send_lock:
+            conn.send(msg)
+
+    # Tasks are admitted by the parent process before they are sent here
+    _SCHEDULER_STATE['enabled'] = False
+
+    def run(call_id, name, kwargs, has_callback, settings):
+        # Settings travel with every call, so configure_* changes made in the
+        # parent after the worker started still apply
+        _apply_worker_settings(settings)
+        if has_callback:
+            kwargs['callback'] = _ProgressProxy(send, call_id)
+        try:
+            result = globals()[name](**kwargs)
+        except Exception as e:
+            result = json.dumps({'success': False, **_parse_error_code(str(e))})
+        send(('result', call_id, result))
+
+    with ThreadPoolExecutor(max_workers=tasks_per_worker) as executor:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == 'call':
+                executor.submit(run, *msg[1:])
+            elif msg[0] == 'cancel':
+                cancel_download(msg[1])
+            elif msg[0] == 'stop':
+                break
+
+
+def _worker_crashed_result():
+    return json.dumps({
+        'success': False,
+        'error': 'Worker process exited unexpectedly',
+        'error_code': 'WORKER_CRASHED',
+    })
+
+
+class _WorkerProcess:
+    """Parent-side handle on one worker process."""
+
+    def __init__(self, ctx, tasks_per_worker):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, tasks_per_worker),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = {}  # call_id -> [event, result, callback, task_id]
+        self._broken = False
+        self._reader = threading.Thread(target=self._read_loop, name='ytdlp-worker-reader', daemon=True)
+        self._reader.start()
+
+    @property
+    def active(self):
+        with self._lock:
+            return len(self._pending)
+
+    def is_alive(self):
+        return not self._broken and self.process.is_alive()
+
+    def send(self, msg):
+        with self._send_lock:
+            self.conn.send(msg)
+
+    def submit(self, call_id, name, kwargs, callback, task_id):
+        done = threading.Event()
+        slot = [done, None, callback, task_id]
+        with self._lock:
+            self._pending[call_id] = slot
+        try:
+            self.send(('call', call_id, name, kwargs, callback is not None, _worker_settings()))
+        except (OSError, ValueError) as e:
+            # The pipe is gone: retire this worker so the pool spawns a new one
+            print(f"Worker pipe failed: {e}")
+            with self._lock:
+                self._pending.pop(call_id, None)
+            self._broken = True
+            self.process.terminate()
+            slot[1] = _worker_crashed_result()
+            done.set()
+        return slot
+
+    def holds(self, task_id):
+        with self._lock:
+            return any(slot[3] == task_id for slot in self._pending.values())
+
+    def _read_loop(self):
+        while True:
+            try:
+                kind, call_id, payload = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                slot = self._pending.get(call_id)
+            if slot is None:
+                continue
+            if kind == 'progress':
+                try:
+                    slot[2].onProgress(*payload)
+                except Exception as e:
+                    print(f"Error in callback: {e}")
+            elif kind == 'result':
+                with self._lock:
+                    self._pending.pop(call_id, None)
+                slot[1] = payload
+                slot[0].set()
+
+        # Worker died: fail everything still in flight
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for slot in pending.values():
+            slot[1] = _worker_crashed_result()
+            slot[0].set()
+
+    def stop(self):
+        try:
+            self.send(('stop',))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class _ProcessPool:
+    """Dispatch bridge calls to the least busy worker, respawning dead ones."""
+
+    def __init__(self, workers, tasks_per_worker):
+        self._ctx = multiprocessing.get_context('spawn')
+        self._size = workers
+        self._tasks_per_worker = tasks_per_worker
+        self._workers = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def _pick_worker(self):
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            idle = [w for w in self._workers if w.active < self._tasks_per_worker]
+            if idle:
+                return min(idle, key=lambda w: w.active)
+            if len(self._workers) < self._size:
+                worker = _WorkerProcess(self._ctx, self._tasks_per_worker)
+                self._workers.append(worker)
+                return worker
+            return min(self._workers, key=lambda w: w.active)
+
+    def call(self, name, kwargs, callback=None, task_id=None):
+        """Run a bridge function in a worker and block until it returns."""
+        forward = getattr(_PROFILE_LOCAL, 'forward', False)
+        if forward:
+            kwargs = {**kwargs, 'profile': forward}
+        slot = self._pick_worker().submit(next(self._ids), name, kwargs, callback, task_id)
+        slot[0].wait()
+        if task_id:
+            _clear_cancelled(task_id)
+        return slot[1]
+
+    def cancel(self, task_id):
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            if worker.holds(task_id):
+                try:
+                    worker.send(('cancel', task_id))
+                except (OSError, ValueError):
+                    pass
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+
+def _use_process_pool():
+    return _EXECUTION_MODE['mode'] == 'process' and _PROCESS_POOL is not None
+
+
+def configure_execution_mode(mode='thread', workers=None, tasks_per_worker=None):
+    """
+    Choose where bridge calls run.
+
+    Args:
+        mode (str): 'thread' (in this interpreter) or 'process' (worker processes)
+        workers (int): Maximum number of worker processes (defaults to CPU count)
+        tasks_per_worker (int): Concurrent calls each worker runs on its threads
+
+    In process mode the scheduler still admits calls in this process, but it
+    cannot pause a download that is already running in a worker. Storage
+    admission runs inside each worker and only accounts for that worker's
+    tasks.
+
+    Returns:
+        str: JSON with the active execution mode
+    """
+    global _PROCESS_POOL
+
+    if mode not in ('thread', 'process'):
+        return json.dumps({
+            'success': False,
+            'error': f'Unknown execution mode: {mode}',
+        })
+
+    workers = _safe_int(workers) or os.cpu_count() or 2
+    tasks_per_worker = _safe_int(tasks_per_worker) or _EXECUTION_MODE['tasks_per_worker']
+
+    with _PROCESS_POOL_LOCK:
+        old_pool = _PROCESS_POOL
+        _PROCESS_POOL = _ProcessPool(workers, tasks_per_worker) if mode == 'process' else None
+        _EXECUTION_MODE.update({
+            'mode': mode,
+            'workers': workers if mode == 'process' else None,
+            'tasks_per_worker': tasks_per_worker,
+        })
+    if old_pool is not None:
+        old_pool.shutdown()
+
+    return json.dumps({'success': True, **_EXECUTION_MODE})
+
+
+# ============================================================================
+# ASYNCIO FACADE
+# ============================================================================
+
+# Coroutine-friendly wrappers for hosts that run an event loop. Blocking calls
+# run on a bounded thread pool, so any number of jobs can be started from one
+# loop while at most _ASYNC_MAX_WORKERS of them execute at once. Downloads
+# going through the task scheduler queue on the loop instead and run on their
+# own thread once admitted, bounded by the scheduler's class limits.
+_ASYNC_MAX_WORKERS = 8
+_ASYNC_PROGRESS_BUFFER = 256
+_ASYNC_EXECUTOR = None
+_ASYNC_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_async_executor():
+    global _ASYNC_EXECUTOR
+    with _ASYNC_EXECUTOR_LOCK:
+        if _ASYNC_EXECUTOR is None:
+            _ASYNC_EXECUTOR = ThreadPoolExecutor(
+                max_workers=_ASYNC_MAX_WORKERS, thread_name_prefix='ytdlp-async')
+        return _ASYNC_EXECUTOR
+
+
+def configure_async_executor(max_workers):
+    """
+    Set how many blocking bridge calls the asyncio facade runs at once.
+
+    Jobs already running finish on the previous executor.
+
+    Args:
+        max_workers (int): Thread pool size
+    """
+    global _ASYNC_EXECUTOR, _ASYNC_MAX_WORKERS
+    with _ASYNC_EXECUTOR_LOCK:
+        old = _ASYNC_EXECUTOR
+        _ASYNC_MAX_WORKERS = max(1, int(max_workers))
+        _ASYNC_EXECUTOR = None
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+class AsyncJob:
+    """
+    Handle on a bridge call running behind the asyncio facade.
+
+    Await it for the structured result, or iterate it with ``async for`` to
+    receive progress events until the job finishes. Cancelling the job, or
+    the task awaiting it, cancels the underlying download(s).
+    """
+
+    def __init__(self, runner):
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        self._task = self._loop.create_task(runner(self))
+        self._task.add_done_callback(lambda _: self._push(None))
+
+    def _push(self, event):
+        # Progress is advisory: when nobody is reading, keep only the newest
+        if event is not None and self._events.qsize() >= _ASYNC_PROGRESS_BUFFER:
+            self._events.get_nowait()
+        self._events.put_nowait(event)
+
+    def _push_threadsafe(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._push, event)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def cancel(self):
+        return self._task.cancel()
+
+    def done(self):
+        return self._task.done()
+
+    def __await__(self):
+        return self._task.__await__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._events.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class _AsyncProgressCallback:
+    """Forward bridge progress callbacks into an AsyncJob's event queue."""
+
+    def __init__(self, job, index=None):
+        self._job = job
+        self._index = index
+
+    def onProgress(self, task_id, progress, speed, eta, downloaded_bytes,
+                   total_bytes, item_index, item_count):
+        self._job._push_threadsafe({
+            'task_id': task_id,
+            'index': self._index,
+            'progress': progress,
+            'speed': speed,
+            'eta': eta,
+            'downloaded_bytes': downloaded_bytes,
+            'total_bytes': total_bytes,
+            'item_index': item_index,
+            'item_count': item_count,
+        })
+
+
+def _start_thread(fn):
+    """Run fn on a thread of its own and return a Future for its result."""
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='ytdlp-admitted', daemon=True).start()
+    return future
+
+
+async def _run_blocking(func, submitted=None, **kwargs):
+    """Run a JSON-returning bridge function off the event loop and decode it."""
+    task_id = kwargs.get('task_id')
+    priority = kwargs.get('priority', 'normal')
+    if (func is download_media and task_id and _SCHEDULER_STATE['enabled']
+            and priority in _PRIORITY_CLASSES):
+        # Queue on the event loop, so waiting jobs hold no thread; the wait
+        # counts from when the job was submitted
+        if await _admit_task_async(priority, task_id, submitted or time.monotonic()) is None:
+            return {'success': False, 'error': 'Download cancelled',
+                    'error_code': 'CANCELLED', 'cancelled': True}
+        # Admitted downloads are bounded by the scheduler's class limits; on
+        # the shared pool, threads held by paused background downloads could
+        # keep an admitted interactive one from ever starting
+        future = _start_thread(functools.partial(func, **kwargs))
+    else:
+        future = _get_async_executor().submit(functools.partial(func, **kwargs))
+    try:
+        return json.loads(await asyncio.wrap_future(future))
+    except asyncio.CancelledError:
+        # Not started yet: dropping it from the queue is enough
+        if future.cancel():
+            _drop_preadmitted(task_id)
+        elif task_id:
+            cancel_download(task_id)
+        raise
+
+
+async def async_get_media_info(url, cookies_file=None):
+    """
+    Coroutine version of get_media_info.
+
+    Returns:
+        dict: Decoded media info result
+    """
+    return await _run_blocking(get_media_info, url=url, cookies_file=cookies_file)
+
+
+def async_download_media(url, output_path, task_id=None, **kwargs):
+    """
+    Start download_media from a running event loop.
+
+    Args:
+        url (str): Media URL to download
+        output_path (str): Directory path to save media
+        task_id (str): Unique task ID (generated if omitted)
+        **kwargs: Any other download_media argument except callback
+
+    Returns:
+        AsyncJob: Awaitable for the result dict, async-iterable for progress
+    """
+    task_id = task_id or uuid.uuid4().hex
+    submitted = time.monotonic()
+
+    async def runner(job):
+        return await _run_blocking(
+            download_media, submitted=submitted, task_id=task_id, url=url,
+            output_path=output_path, callback=_AsyncProgressCallback(job), **kwargs)
+
+    return AsyncJob(runner)
+
+
+def async_download_batch(urls, output_path, concurrency=None, task_id_prefix=None, **kwargs):
+    """
+    Download several URLs concurrently from a running event loop.
+
+    Progress events carry the index of the URL they belong to. Each item's
+    task ID is '<prefix>-<index>'.
+
+    Args:
+        urls (list): Media URLs to download
+        output_path (str): Directory path to save media
+        concurrency (int): Maximum downloads in flight for this batch
+        task_id_prefix (str): Prefix for per-item task IDs (generated if omitted)
+        **kwargs: Any other download_media argument except callback
+
+    Returns:
+        AsyncJob: Awaitable for the list of result dicts (in input order),
+            async-iterable for progress
+    """
+    prefix = task_id_prefix or uuid.uuid4().hex
+    limit = asyncio.Semaphore(_safe_int(concurrency) or _ASYNC_MAX_WORKERS)
+    submitted = time.monotonic()
+
+    async def runner(job):
+        async def one(index, url):
+            async with limit:
+                return await _run_blocking(
+                    download_media, submitted=submitted, task_id=f'{prefix}-{index}',
+                    url=url, output_path=output_path,
+                    callback=_AsyncProgressCallback(job, index), **kwargs)
+
+        return await asyncio.gather(*(one(i, url) for i, url in enumerate(urls)))
+
+    return AsyncJob(runner)
+
+
+# ============================================================================
+# JSON-RPC DAEMON
+# ============================================================================
+
+# A long-lived server for desktop engines. It keeps the interpreter, yt-dlp's
+# extractor registry and the caches above warm between requests. The protocol
+# is JSON-RPC 2.0 over a local TCP or Unix socket, one JSON message per line.
+# download_media streams 'progress' notifications tagged with the request id.
+# Requests on one connection run concurrently, up to the async executor size;
+# cancel_download and the status getters answer on the event loop, so a
+# cancel is never queued behind the downloads it targets. In-flight downloads
+# are cancelled when their connection closes.
+#
+# Any local process (including a web page posting to 127.0.0.1) can reach a
+# TCP port, so TCP clients always have to authenticate; without a configured
+# token one is generated and printed on the ready line. Lines that look like
+# HTTP close the connection.
+_RPC_METHODS = {
+    'get_video_info': get_video_info,
+    'get_media_info': get_media_info,
+    'download_media': download_media,
+    'cancel_download': cancel_download,
+    'get_supported_sites': get_supported_sites,
+    'extract_cookies_from_browser': extract_cookies_from_browser,
+    'prefetch_thumbnails': prefetch_thumbnails,
+    'get_throughput_stats': get_throughput_stats,
+    'get_component_cache_status': get_component_cache_status,
+    'get_storage_status': get_storage_status,
+    'get_download_archive_status': get_download_archive_status,
+    'sync_playlist': sync_playlist,
+    'get_scheduler_stats': get_scheduler_stats,
+    'get_profiling_status': get_profiling_status,
+}
+
+# Quick, non-blocking calls answered inline on the event loop
+_RPC_INLINE_METHODS = {
+    cancel_download,
+    get_throughput_stats,
+    get_component_cache_status,
+    get_storage_status,
+    get_download_archive_status,
+    get_scheduler_stats,
+    get_profiling_status,
+}
+
+_RPC_HTTP_PREFIXES = (b'GET ', b'POST ', b'PUT ', b'DELETE ', b'HEAD ', b'OPTIONS ',
+                      b'PATCH ', b'CONNECT ', b'TRACE ', b'HTTP/')
+
+_RPC_PARSE_ERROR = -32700
+_RPC_INVALID_REQUEST = -32600
+_RPC_METHOD_NOT_FOUND = -32601
+_RPC_INVALID_PARAMS = -32602
+_RPC_INTERNAL_ERROR = -32603
+_RPC_UNAUTHORIZED = -32001
+
+
+def _decode_bridge_result(result):
+    """Bridge functions return JSON strings; embed them as objects."""
+    if isinstance(result, str):
+        try:
+            return json.loads(result)
+        except ValueError:
+            return result
+    return result
+
+
+class _RpcConnection:
+    """One client connection to the daemon."""
+
+    def __init__(self, reader, writer, token):
+        self._reader = reader
+        self._writer = writer
+        self._token = token
+        self._authorized = token is None
+        self._write_lock = asyncio.Lock()
+        self._tasks = set()
+
+    async def send(self, message):
+        data = (json.dumps(message) + '\n').encode()
+        async with self._write_lock:
+            self._writer.write(data)
+            await self._writer.drain()
+
+    async def _error(self, req_id, code, message):
+        await self.send({
+            'jsonrpc': '2.0',
+            'id': req_id,
+            'error': {'code': code, 'message': message},
+        })
+
+    async def _handle(self, request):
+        req_id = request.get('id')
+        method = request.get('method')
+        params = request.get('params') or {}
+
+        if method == 'auth':
+            self._authorized = self._token is None or params.get('token') == self._token
+            if not self._authorized:
+                return await self._error(req_id, _RPC_UNAUTHORIZED, 'Invalid token')
+            return await self.send({'jsonrpc': '2.0', 'id': req_id, 'result': True})
+        if not self._authorized:
+            return await self._error(req_id, _RPC_UNAUTHORIZED, 'Authenticate first')
+
+        func = _RPC_METHODS.get(method)
+        if func is None:
+            return await self._error(req_id, _RPC_METHOD_NOT_FOUND, f'Unknown method: {method}')
+        if not isinstance(params, dict):
+            return await self._error(req_id, _RPC_INVALID_PARAMS, 'params must be an object')
+
+        try:
+            if func is download_media:
+                params.pop('callback', None)
+                job = async_download_media(**params)
+                async for event in job:
+                    await self.send({
+                        'jsonrpc': '2.0',
+                        'method': 'progress',
+                        'params': {'id': req_id, **event},
+                    })
+                result = await job
+            elif func in _RPC_INLINE_METHODS:
+                result = _decode_bridge_result(func(**params))
+            else:
+                result = _decode_bridge_result(await asyncio.wrap_future(
+                    _get_async_executor().submit(functools.partial(func, **params))))
+        except TypeError as e:
+            return await self._error(req_id, _RPC_INVALID_PARAMS, str(e))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return await self._error(req_id, _RPC_INTERNAL_ERROR, str(e))
+
+        if req_id is not None:
+            await self.send({'jsonrpc': '2.0', 'id': req_id, 'result': result})
+
+    async def serve(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if line.lstrip().upper().startswith(_RPC_HTTP_PREFIXES):
+                    # A browser or HTTP client, not a bridge client
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    await self._error(None, _RPC_PARSE_ERROR, 'Parse error')
+                    continue
+                if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                    await self._error(None, _RPC_INVALID_REQUEST, 'Invalid request')
+                    continue
+
+                task = asyncio.create_task(self._handle(request))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._writer.close()
+
+
+async def _serve_async(host, port, socket_path, token, ready):
+    async def on_connect(reader, writer):
+        await _RpcConnection(reader, writer, token).serve()
+
+    # Large lines: prefetch_thumbnails accepts whole media info results
+    limit = 16 * 1024 * 1024
+    if socket_path:
+        try:
+            mode = os.lstat(socket_path).st_mode
+        except FileNotFoundError:
+            mode = None
+        if mode is not None:
+            # Only a socket left behind by an earlier run is ours to replace
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f'Refusing to replace non-socket file: {socket_path}')
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(on_connect, path=socket_path, limit=limit)
+        os.chmod(socket_path, 0o600)
+        address = socket_path
+    else:
+        server = await asyncio.start_server(on_connect, host=host, port=port, limit=limit)
+        address = '{}:{}'.format(*server.sockets[0].getsockname()[:2])
+
+    ready(address)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(host='127.0.0.1', port=0, socket_path=None, token=None, max_workers=None):
+    """
+    Run the bridge as a JSON-RPC daemon until interrupted.
+
+    Prints one line of JSON with the listening address once ready, so a parent
+    process can discover an ephemeral port, plus the token when it was
+    generated here.
+
+    Args:
+        host (str): Interface to bind for TCP (ignored with socket_path)
+        port (int): TCP port, 0 for an ephemeral one
+        socket_path (str): Serve on a Unix domain socket instead of TCP
+        token (str): Shared secret clients must send via 'auth'; optional for
+            Unix sockets, generated for TCP when omitted
+        max_workers (int): Concurrent blocking calls (see configure_async_executor)
+    """
+    if max_workers:
+        configure_async_executor(max_workers)
+    generated = None
+    if not socket_path and not token:
+        token = generated = secrets.token_urlsafe(32)
+
+    # Warm the extractor registry before the first request arrives
+    yt_dlp.extractor.gen_extractor_classes()
+
+    stdout = sys.stdout
+
+    def ready(address):
+        line = {'listening': address, 'pid': os.getpid()}
+        if generated:
+            line['token'] = generated
+        print(json.dumps(line), file=stdout, flush=True)
+        # Keep stdout to the ready line: yt-dlp's console output goes to
+        # stderr so a parent that stops reading stdout never blocks us
+        sys.stdout = sys.stderr
+
+    try:
+        asyncio.run(_serve_async(host, port, socket_path, token, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = stdout
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description='yt-dlp bridge daemon')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve_parser = sub.add_parser('serve', help='Run the JSON-RPC daemon')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=0)
+    serve_parser.add_argument('--socket', dest='socket_path')
+    serve_parser.add_argument('--token', default=os.environ.get('YTDLP_BRIDGE_TOKEN'))
+    serve_parser.add_argument('--max-workers', type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args.host, args.port, args.socket_path, args.token, args.max_workers)
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,110 @@
+"""
+Unit tests for the EJS component cache in downloader.py.
+
+The solver hashes are replaced with those of small stand-in scripts, so the
+cache is seeded and verified without touching the network. Run with:
+python -m pytest plugins/ytdlp_bridge/test/python
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'android', 'src', 'main', 'python'))
+
+import downloader  # noqa: E402
+
+SCRIPTS = {
+    'yt.solver.lib.min.js': 'var lib = 1;',
+    'yt.solver.core.min.js': 'var core = 2;',
+}
+
+
+@pytest.fixture
+def bundled_dir(tmp_path):
+    path = tmp_path / 'bundled'
+    path.mkdir()
+    for filename, code in SCRIPTS.items():
+        (path / filename).write_text(code, encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def refreshes(monkeypatch):
+    monkeypatch.setattr(downloader, '_EJS_VERSION', 'test-version')
+    monkeypatch.setattr(downloader, '_EJS_HASHES', {
+        filename: hashlib.sha3_512(code.encode()).hexdigest()
+        for filename, code in SCRIPTS.items()
+    })
+    monkeypatch.setattr(downloader, '_EJS_STATE', {
+        'cache_dir': None,
+        'ready': False,
+        'stamps': None,
+        'refreshing': False,
+        'last_refresh': 0,
+        'last_error': None,
+    })
+    # Record refresh requests instead of going to GitHub
+    calls = []
+    monkeypatch.setattr(downloader, '_start_component_refresh',
+                        lambda force=False: calls.append(force))
+    return calls
+
+
+def test_seeded_cache_disables_remote_components(tmp_path, bundled_dir, refreshes):
+    cache_dir = str(tmp_path / 'cache')
+    status = json.loads(downloader.configure_component_cache(cache_dir, refresh=False))
+    assert not status['ready']
+
+    result = json.loads(downloader.seed_component_cache(str(bundled_dir)))
+    assert result['success']
+    assert sorted(result['installed']) == ['core', 'lib']
+    assert result['ready']
+    assert downloader._ejs_cache_is_valid(cache_dir)
+
+    opts = downloader._apply_component_cache({})
+    assert opts['cachedir'] == cache_dir
+    assert opts['remote_components'] == []
+    assert refreshes == []
+
+
+def test_tampered_script_is_rejected(tmp_path, bundled_dir, refreshes):
+    (bundled_dir / 'yt.solver.core.min.js').write_text('var core = 3;', encoding='utf-8')
+    downloader.configure_component_cache(str(tmp_path / 'cache'), refresh=False)
+
+    result = json.loads(downloader.seed_component_cache(str(bundled_dir)))
+    assert not result['success']
+    assert result['installed'] == ['lib']
+    assert 'core' in result['errors']
+    assert not result['ready']
+
+
+def test_changed_cache_files_are_verified_again(tmp_path, bundled_dir, refreshes):
+    cache_dir = str(tmp_path / 'cache')
+    downloader.configure_component_cache(cache_dir, bundled_dir=str(bundled_dir), refresh=False)
+    assert downloader._apply_component_cache({})['remote_components'] == []
+
+    # Overwrite a verified script in place: the stamp changes, the hash fails
+    path = downloader._ejs_cache_file(cache_dir, 'core')
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    payload['data']['code'] = 'var core = 3;'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+
+    assert downloader._apply_component_cache({})['remote_components'] == ['ejs:github']
+    assert not json.loads(downloader.get_component_cache_status())['ready']
+    assert refreshes == [False]
+
+
+def test_deleted_cache_falls_back_to_github(tmp_path, bundled_dir, refreshes):
+    cache_dir = str(tmp_path / 'cache')
+    downloader.configure_component_cache(cache_dir, bundled_dir=str(bundled_dir), refresh=False)
+
+    os.remove(downloader._ejs_cache_file(cache_dir, 'lib'))
+
+    assert downloader._apply_component_cache({})['remote_components'] == ['ejs:github']
@@ -0,0 +1,109 @@
+"""
+Unit tests for the download archive index in downloader.py.
+
+Run with: python -m pytest plugins/ytdlp_bridge/test/python
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'android', 'src', 'main', 'python'))
+
+import downloader  # noqa: E402
+
+KEY = 'youtube abc123 best'
+
+
+def record(key, filename):
+    return f'{downloader._ArchiveIndex._digest(key)} {filename}\n'
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / 'archive.idx')
+
+
+def test_add_and_get(index_path):
+    index = downloader._ArchiveIndex(index_path)
+    assert index.get(KEY) is None
+
+    index.add(KEY, '/downloads/a.mp4')
+    index.add(KEY, '/downloads/a.mp4')  # Unchanged, not appended again
+
+    assert index.get(KEY) == '/downloads/a.mp4'
+    assert len(index) == 1
+    with open(index_path, encoding='utf-8') as f:
+        assert f.read() == record(KEY, '/downloads/a.mp4')
+
+    # A fresh index loads the same records from disk
+    assert downloader._ArchiveIndex(index_path).get(KEY) == '/downloads/a.mp4'
+
+
+def test_tail_refresh_picks_up_other_writers(index_path):
+    index = downloader._ArchiveIndex(index_path)
+    index.add(KEY, '/downloads/a.mp4')
+
+    # Another process appends one full record and half of the next
+    other = 'youtube def456 best'
+    partial = record('youtube ghi789 best', '/downloads/c.mp4')
+    with open(index_path, 'a', encoding='utf-8') as f:
+        f.write(record(other, '/downloads/b.mp4'))
+        f.write(partial[:20])
+
+    assert index.get(other) == '/downloads/b.mp4'
+    assert index.get('youtube ghi789 best') is None
+
+    with open(index_path, 'a', encoding='utf-8') as f:
+        f.write(partial[20:])
+    assert index.get('youtube ghi789 best') == '/downloads/c.mp4'
+
+    # A later record for the same key wins
+    with open(index_path, 'a', encoding='utf-8') as f:
+        f.write(record(KEY, '/downloads/a2.mp4'))
+    assert index.get(KEY) == '/downloads/a2.mp4'
+    assert len(index) == 3
+
+
+def test_truncated_file_is_reloaded(index_path):
+    index = downloader._ArchiveIndex(index_path)
+    index.add(KEY, '/downloads/a.mp4')
+    index.add('youtube def456 best', '/downloads/b.mp4')
+
+    # Replaced by a shorter file, e.g. the user cleared the archive
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write(record('youtube ghi789 best', '/downloads/c.mp4'))
+
+    assert index.get(KEY) is None
+    assert index.get('youtube ghi789 best') == '/downloads/c.mp4'
+    assert len(index) == 1
+
+
+def test_deleted_output_is_a_miss(tmp_path, index_path):
+    output = tmp_path / 'a.mp4'
+    output.write_bytes(b'video')
+    index = downloader._ArchiveIndex(index_path)
+    index.add('youtube abc123 best', str(output))
+    view = downloader._ArchiveView(index, 'best')
+
+    assert 'youtube abc123' in view
+    assert view.skipped_filename('youtube abc123') == str(output)
+
+    output.unlink()
+    assert 'youtube abc123' not in downloader._ArchiveView(index, 'best')
+    # Other format selections are recorded separately
+    assert 'youtube abc123' not in downloader._ArchiveView(index, 'bestaudio')
+
+
+def test_archive_is_off_until_a_path_is_configured(index_path, monkeypatch):
+    monkeypatch.setattr(downloader, '_ARCHIVE_STATE', {'path': None, 'enabled': False})
+
+    assert not json.loads(downloader.configure_download_archive(enabled=True))['success']
+    assert not downloader._ARCHIVE_STATE['enabled']
+
+    status = json.loads(downloader.configure_download_archive(index_path))
+    assert status['enabled']
+    assert status['path'] == index_path
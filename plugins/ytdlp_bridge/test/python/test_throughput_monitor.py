@@ -0,0 +1,258 @@
+"""
+Unit tests for the adaptive throttle detection in downloader.py.
+
+The monitor takes an injectable clock, so most tests drive time by hand and
+run instantly; one end-to-end test downloads from a local server that
+throttles on purpose. Run with: python -m pytest plugins/ytdlp_bridge/test/python
+"""
+
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+from yt_dlp.utils import ThrottledDownload
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'android', 'src', 'main', 'python'))
+
+import downloader  # noqa: E402
+
+HOST = 'example.com'
+URL = 'https://cdn.example.com/video.mp4'
+STEP = 0.5  # seconds between progress hook calls
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Stream:
+    """Feeds a monitor progress dicts for one file at a chosen rate."""
+
+    def __init__(self, monitor, clock, filename='video.mp4.part'):
+        self.monitor = monitor
+        self.clock = clock
+        self.filename = filename
+        self.downloaded = 0
+
+    def observe(self, status='downloading'):
+        self.monitor.observe({
+            'status': status,
+            'downloaded_bytes': self.downloaded,
+            'tmpfilename': self.filename,
+            'info_dict': {'url': URL},
+        })
+
+    def run(self, rate, seconds):
+        """Download at rate bytes/s for the given seconds."""
+        for _ in range(int(seconds / STEP)):
+            self.clock.now += STEP
+            self.downloaded += int(rate * STEP)
+            self.observe()
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    downloader._HOST_BASELINES.clear()
+    downloader._THROUGHPUT_STATS.clear()
+    yield
+    downloader._HOST_BASELINES.clear()
+    downloader._THROUGHPUT_STATS.clear()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_stream(clock):
+    stream = Stream(downloader._ThroughputMonitor('task', clock=clock), clock)
+    stream.observe()
+    return stream
+
+
+def test_learns_baseline_and_shares_it_with_the_host(clock):
+    stream = make_stream(clock)
+    stream.run(1_000_000, 20)
+
+    assert stream.monitor._baseline == pytest.approx(1_000_000, rel=0.05)
+    assert HOST not in downloader._HOST_BASELINES
+
+    stream.observe('finished')
+    assert downloader._HOST_BASELINES[HOST] == pytest.approx(1_000_000, rel=0.05)
+
+    # The next download from the host starts from the learned baseline
+    following = make_stream(clock)
+    assert following.monitor._baseline == downloader._HOST_BASELINES[HOST]
+
+
+def test_no_decision_during_warmup(clock):
+    stream = make_stream(clock)
+    stream.run(1_000_000, downloader._THROUGHPUT_WARMUP - STEP)
+
+    assert stream.monitor._baseline is None
+
+
+def test_collapse_past_grace_raises(clock):
+    stream = make_stream(clock)
+    stream.run(1_000_000, 20)
+
+    # Within the grace period the collapse is only noted
+    stream.run(10_000, downloader._THROUGHPUT_GRACE)
+    assert stream.monitor.reconnects == 0
+    assert downloader._THROUGHPUT_STATS[HOST]['collapses'] == 1
+
+    with pytest.raises(ThrottledDownload):
+        stream.run(10_000, 2 * downloader._THROUGHPUT_GRACE)
+    assert stream.monitor.reconnects == 1
+    assert downloader._THROUGHPUT_STATS[HOST]['reconnects'] == 1
+
+
+def test_brief_dip_does_not_raise(clock):
+    stream = make_stream(clock)
+    stream.run(1_000_000, 20)
+    stream.run(10_000, downloader._THROUGHPUT_WINDOW)
+    stream.run(1_000_000, 20)
+
+    assert stream.monitor.reconnects == 0
+
+
+@pytest.mark.parametrize('rate', [8_000, 20_000, 100_000])
+def test_slow_but_steady_link_never_reconnects(clock, rate):
+    stream = make_stream(clock)
+    stream.run(rate, 600)
+
+    assert stream.monitor.reconnects == 0
+    assert stream.monitor._baseline == pytest.approx(rate, rel=0.05)
+    assert HOST not in downloader._THROUGHPUT_STATS
+
+
+def test_reconnects_are_capped(clock):
+    stream = make_stream(clock)
+    stream.run(1_000_000, 20)
+
+    raised = 0
+    for _ in range(downloader._MAX_RECONNECTS + 2):
+        try:
+            # Well above the minimum baseline, so only the learned one flags it
+            stream.run(100_000, 60)
+        except ThrottledDownload:
+            raised += 1
+            # yt-dlp resumes the same .part file from a fresh URL
+            stream.observe()
+
+    assert raised == downloader._MAX_RECONNECTS
+    assert stream.monitor.reconnects == downloader._MAX_RECONNECTS
+    stats = downloader._THROUGHPUT_STATS[HOST]
+    assert stats['reconnects'] == downloader._MAX_RECONNECTS
+    assert stats['gave_up'] == 1
+
+
+def test_giving_up_is_final_for_the_file(clock):
+    stream = make_stream(clock)
+    stream.run(1_000_000, 20)
+    stream.monitor.reconnects = downloader._MAX_RECONNECTS
+
+    stream.run(100_000, 600)
+
+    # One collapse, one give-up, and no re-counting every grace period
+    stats = downloader._THROUGHPUT_STATS[HOST]
+    assert stats['collapses'] == 1
+    assert stats['gave_up'] == 1
+
+
+class ThrottlingHandler(http.server.BaseHTTPRequestHandler):
+    """Serves one file with Range support and stalls the first stream that gets far enough."""
+
+    protocol_version = 'HTTP/1.1'
+    data = os.urandom(1024 * 1024)
+    throttle_at = 512 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        start = 0
+        rng = self.headers.get('Range')
+        if rng:
+            start = int(rng.split('=')[1].split('-')[0])
+            self.server.resumed_from.append(start)
+        body = self.data[start:]
+        self.send_response(206 if rng else 200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Accept-Ranges', 'bytes')
+        if rng:
+            self.send_header('Content-Range', f'bytes {start}-{len(self.data) - 1}/{len(self.data)}')
+        self.end_headers()
+
+        sent = 0
+        try:
+            while sent < len(body):
+                stall = False
+                with self.server.lock:
+                    if not self.server.throttled and start + sent >= self.throttle_at:
+                        self.server.throttled = stall = True
+                if stall:
+                    # ~80 KB/s until the client gives up on this connection
+                    deadline = time.monotonic() + 30
+                    while sent < len(body) and time.monotonic() < deadline:
+                        self.wfile.write(body[sent:sent + 8192])
+                        self.wfile.flush()
+                        sent += 8192
+                        time.sleep(0.1)
+                    return
+                self.wfile.write(body[sent:sent + 16384])
+                self.wfile.flush()
+                sent += 16384
+                time.sleep(0.02)  # ~800 KB/s
+        except OSError:
+            pass  # Client hung up
+
+
+@pytest.fixture
+def throttling_server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.throttled = False
+    server.resumed_from = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_stall_reextracts_and_resumes(throttling_server, tmp_path, monkeypatch):
+    # Scale the detector down so the test takes seconds, not minutes
+    monkeypatch.setattr(downloader, '_THROUGHPUT_WINDOW', 0.5)
+    monkeypatch.setattr(downloader, '_THROUGHPUT_WARMUP', 0.5)
+    monkeypatch.setattr(downloader, '_THROUGHPUT_GRACE', 0.5)
+    monkeypatch.setattr(downloader, '_THROUGHPUT_MIN_BASELINE', 1024)
+
+    port = throttling_server.server_address[1]
+    result = json.loads(downloader.download_media(
+        f'http://127.0.0.1:{port}/video.mp4', str(tmp_path),
+        task_id='throttle-e2e', sleep_interval=0, skip_archived=False,
+    ))
+
+    assert result['success'], result
+    assert throttling_server.throttled
+    # The re-extracted download resumed from the .part file, not from zero
+    resumed = [start for start in throttling_server.resumed_from if start]
+    assert resumed and min(resumed) >= ThrottlingHandler.throttle_at
+    stats = list(downloader._THROUGHPUT_STATS.values())
+    assert [s['reconnects'] for s in stats] == [1]
+
+    files = [p for p in tmp_path.iterdir() if p.suffix == '.mp4']
+    assert len(files) == 1
+    assert files[0].read_bytes() == ThrottlingHandler.data
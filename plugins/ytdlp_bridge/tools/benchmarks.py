@@ -0,0 +1,303 @@
+"""
+Development benchmarks for the yt-dlp bridge module.
+
+These switch process-wide settings of the downloader module while they run,
+so they live outside it and are meant to be run from a shell on a
+development machine, never inside the app:
+
+    python plugins/ytdlp_bridge/tools/benchmarks.py write-path URL /tmp/bench
+    python plugins/ytdlp_bridge/tools/benchmarks.py execution-modes /tmp/bench URL...
+    python plugins/ytdlp_bridge/tools/benchmarks.py daemon --params '{"url": "URL"}'
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'android', 'src', 'main', 'python'))
+
+import downloader  # noqa: E402
+
+
+# ============================================================================
+# DISK WRITE PATH
+# ============================================================================
+
+# yt-dlp's own behaviour: 1 KB initial blocks, no preallocation
+_LEGACY_WRITE_PATH = {'preallocate': False, 'buffer_size': 1024, 'part_files': True}
+
+
+def benchmark_write_path(url, output_path, runs=3, **download_kwargs):
+    """
+    Compare the legacy write path with the current one on real downloads.
+
+    Each run downloads url into a fresh sub-directory of output_path, once
+    with yt-dlp's defaults (1 KB initial blocks, no preallocation) and once
+    with the configured write path. Timing starts at the first progress
+    event, so extraction and anti-ban sleeps are not counted.
+
+    Returns:
+        str: JSON with mean seconds and bytes/second per write path
+    """
+    class FirstProgress:
+        def __init__(self):
+            self.at = None
+
+        def onProgress(self, *args):
+            if self.at is None:
+                self.at = time.monotonic()
+
+    current = dict(downloader._WRITE_PATH)
+    results = {}
+    try:
+        for name, settings in (('legacy', _LEGACY_WRITE_PATH), ('configured', current)):
+            downloader._WRITE_PATH.update(settings)
+            timings = []
+            total_bytes = 0
+            for run in range(runs):
+                run_dir = os.path.join(output_path, f'{name}-{run}')
+                os.makedirs(run_dir, exist_ok=True)
+                first = FirstProgress()
+                outcome = json.loads(downloader.download_media(
+                    url, run_dir, task_id=f'bench-{name}-{run}', callback=first,
+                    **download_kwargs))
+                timings.append(time.monotonic() - (first.at or time.monotonic()))
+                if outcome.get('filename') and os.path.exists(outcome['filename']):
+                    total_bytes = os.path.getsize(outcome['filename'])
+            mean = sum(timings) / len(timings)
+            results[name] = {
+                'settings': dict(settings),
+                'mean_seconds': round(mean, 3),
+                'bytes': total_bytes,
+                'bytes_per_second': int(total_bytes / mean) if mean else None,
+            }
+    finally:
+        downloader._WRITE_PATH.update(current)
+
+    return json.dumps({
+        'success': True,
+        'runs': runs,
+        'results': results,
+    })
+
+
+# ============================================================================
+# EXECUTION MODES
+# ============================================================================
+
+def benchmark_execution_modes(urls, output_path, concurrency=4, modes=('thread', 'process'),
+                              **download_kwargs):
+    """
+    Compare aggregate download throughput between execution modes.
+
+    Each mode downloads every URL once, concurrency at a time, into its own
+    sub-directory of output_path.
+
+    Args:
+        urls (list): Media URLs to download
+        output_path (str): Scratch directory for the downloaded files
+        concurrency (int): Number of simultaneous download_media calls
+        modes (tuple): Execution modes to measure
+        **download_kwargs: Extra arguments passed to download_media
+
+    Returns:
+        str: JSON with wall time, bytes and throughput per mode
+    """
+    previous = dict(downloader._EXECUTION_MODE)
+    results = {}
+    try:
+        for mode in modes:
+            downloader.configure_execution_mode(mode, workers=concurrency, tasks_per_worker=1)
+            mode_dir = os.path.join(output_path, mode)
+            os.makedirs(mode_dir, exist_ok=True)
+
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(
+                    lambda u: json.loads(downloader.download_media(u, mode_dir, **download_kwargs)), urls))
+            elapsed = time.monotonic() - started
+
+            total_bytes = 0
+            for outcome in outcomes:
+                for name in outcome.get('filenames') or [outcome.get('filename')]:
+                    if name and os.path.exists(name):
+                        total_bytes += os.path.getsize(name)
+
+            results[mode] = {
+                'seconds': round(elapsed, 3),
+                'bytes': total_bytes,
+                'bytes_per_second': int(total_bytes / elapsed) if elapsed else None,
+                'succeeded': sum(1 for o in outcomes if o.get('success')),
+                'failed': sum(1 for o in outcomes if not o.get('success')),
+            }
+    finally:
+        downloader.configure_execution_mode(previous['mode'], previous['workers'], previous['tasks_per_worker'])
+
+    return json.dumps({
+        'success': True,
+        'concurrency': concurrency,
+        'results': results,
+    })
+
+
+# ============================================================================
+# JSON-RPC DAEMON
+# ============================================================================
+
+def _rpc_roundtrip(sock_file, request, on_first_message=None):
+    """Send one request over a daemon connection and wait for its response."""
+    sock_file.write((json.dumps(request) + '\n').encode())
+    sock_file.flush()
+    first = True
+    while True:
+        line = sock_file.readline()
+        if not line:
+            raise ConnectionError('Daemon closed the connection')
+        if first and on_first_message:
+            on_first_message()
+            first = False
+        message = json.loads(line)
+        if message.get('id') == request['id'] and 'method' not in message:
+            return message
+
+
+def benchmark_daemon(method='get_media_info', params=None, requests=20, concurrency=4):
+    """
+    Compare a warm daemon with spawning a fresh interpreter per call.
+
+    Both modes issue the same requests, concurrency at a time. First-byte
+    latency is the time until the first response line or progress
+    notification arrives.
+
+    Args:
+        method (str): Bridge function to call
+        params (dict): Keyword arguments for the call
+        requests (int): Number of calls per mode
+        concurrency (int): Calls in flight at once
+
+    Returns:
+        str: JSON with requests/second and mean/p95 first-byte latency per mode
+    """
+    params = params or {}
+    module_dir = os.path.dirname(os.path.abspath(downloader.__file__))
+
+    def summarize(elapsed, latencies):
+        latencies = sorted(latencies)
+        return {
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(latencies) / elapsed, 3) if elapsed else None,
+            'first_byte_mean_ms': round(1000 * sum(latencies) / len(latencies), 1) if latencies else None,
+            'first_byte_p95_ms': round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else None,
+        }
+
+    def per_call(_):
+        started = time.monotonic()
+        script = (f'import json, sys; sys.path.insert(0, {module_dir!r}); import downloader; '
+                  f'print(getattr(downloader, {method!r})(**json.loads(sys.argv[1])))')
+        proc = subprocess.Popen([sys.executable, '-c', script, json.dumps(params)],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        proc.stdout.read(1)
+        latency = time.monotonic() - started
+        proc.communicate()
+        return latency
+
+    daemon = subprocess.Popen(
+        [sys.executable, os.path.join(module_dir, 'downloader.py'), 'serve', '--port', '0'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        ready = json.loads(daemon.stdout.readline())
+        host, port = ready['listening'].rsplit(':', 1)
+        ids = itertools.count()
+
+        def via_daemon(conn_file):
+            started = time.monotonic()
+            marks = []
+            _rpc_roundtrip(conn_file, {'jsonrpc': '2.0', 'id': next(ids), 'method': method,
+                                       'params': params},
+                           on_first_message=lambda: marks.append(time.monotonic() - started))
+            return marks[0]
+
+        conns = [socket.create_connection((host, int(port))) for _ in range(concurrency)]
+        conn_files = [c.makefile('rwb') for c in conns]
+        for f in conn_files:
+            _rpc_roundtrip(f, {'jsonrpc': '2.0', 'id': next(ids), 'method': 'auth',
+                               'params': {'token': ready['token']}})
+        idle = queue.Queue()
+        for f in conn_files:
+            idle.put(f)
+
+        def with_connection(_):
+            conn_file = idle.get()
+            try:
+                return via_daemon(conn_file)
+            finally:
+                idle.put(conn_file)
+
+        try:
+            # One warm-up call, like a daemon that has already served traffic
+            via_daemon(conn_files[0])
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                daemon_latencies = list(executor.map(with_connection, range(requests)))
+            daemon_elapsed = time.monotonic() - started
+        finally:
+            for f, c in zip(conn_files, conns):
+                f.close()
+                c.close()
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        process_latencies = list(executor.map(per_call, range(requests)))
+    process_elapsed = time.monotonic() - started
+
+    return json.dumps({
+        'success': True,
+        'method': method,
+        'requests': requests,
+        'concurrency': concurrency,
+        'daemon': summarize(daemon_elapsed, daemon_latencies),
+        'process_per_call': summarize(process_elapsed, process_latencies),
+    })
+
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description='yt-dlp bridge benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+    write_parser = sub.add_parser('write-path', help='Legacy vs configured disk write path')
+    write_parser.add_argument('url')
+    write_parser.add_argument('output_path')
+    write_parser.add_argument('--runs', type=int, default=3)
+    modes_parser = sub.add_parser('execution-modes', help='Thread vs process execution mode')
+    modes_parser.add_argument('output_path')
+    modes_parser.add_argument('urls', nargs='+')
+    modes_parser.add_argument('--concurrency', type=int, default=4)
+    daemon_parser = sub.add_parser('daemon', help='Warm daemon vs interpreter per call')
+    daemon_parser.add_argument('--method', default='get_media_info')
+    daemon_parser.add_argument('--params', type=json.loads, default=None,
+                               help='JSON object of keyword arguments')
+    daemon_parser.add_argument('--requests', type=int, default=20)
+    daemon_parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.command == 'write-path':
+        print(benchmark_write_path(args.url, args.output_path, runs=args.runs))
+    elif args.command == 'execution-modes':
+        print(benchmark_execution_modes(args.urls, args.output_path, concurrency=args.concurrency))
+    elif args.command == 'daemon':
+        print(benchmark_daemon(args.method, args.params, requests=args.requests,
+                               concurrency=args.concurrency))
+
+
+if __name__ == '__main__':
+    _main()